@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_WINDOWS = {"1m": 60, "15m": 900, "1h": 3600, "24h": 86400}
+
+
+class RollingWindow:
+    """
+    Sentiment statistics over the last `seconds`, kept in a ring of
+    preallocated time buckets. Appends are O(1) per score; expired buckets
+    are cleared as the head moves forward, so eviction is O(1) amortized per
+    bucket.
+    """
+
+    def __init__(self, seconds, buckets=60):
+        self.seconds = seconds
+        self.n = buckets
+        self.width = seconds / buckets
+        self.head = None   # newest bucket id seen
+        self.counts = np.zeros(buckets)
+        self.sums = np.zeros(buckets)
+        self.topic_counts = np.zeros((buckets, 8))
+        self.topic_sums = np.zeros((buckets, 8))
+        self.count = 0.0
+        self.total = 0.0
+        self.topic_count_totals = np.zeros(8)
+        self.topic_sum_totals = np.zeros(8)
+        # time-decayed EWMA with time constant equal to the window length
+        self._ewma_num = 0.0
+        self._ewma_den = 0.0
+        self._ewma_ts = None
+
+    def _grow_topics(self, size):
+        cols = self.topic_counts.shape[1]
+        while cols < size:
+            cols *= 2
+        pad = cols - self.topic_counts.shape[1]
+        self.topic_counts = np.pad(self.topic_counts, ((0, 0), (0, pad)))
+        self.topic_sums = np.pad(self.topic_sums, ((0, 0), (0, pad)))
+        self.topic_count_totals = np.pad(self.topic_count_totals, (0, pad))
+        self.topic_sum_totals = np.pad(self.topic_sum_totals, (0, pad))
+
+    def advance(self, now):
+        """Move the head to `now`, clearing buckets that fell out of the window."""
+        bucket = int(now // self.width)
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        for b in range(max(self.head + 1, bucket - self.n + 1), bucket + 1):
+            slot = b % self.n
+            self.count -= self.counts[slot]
+            self.total -= self.sums[slot]
+            self.topic_count_totals -= self.topic_counts[slot]
+            self.topic_sum_totals -= self.topic_sums[slot]
+            self.counts[slot] = 0
+            self.sums[slot] = 0
+            self.topic_counts[slot] = 0
+            self.topic_sums[slot] = 0
+        self.head = bucket
+
+    def add_many(self, ts, scores, topic_idx=None, weights=None):
+        """
+        Add arrays of timestamps, scores and (optional) topic column indexes.
+        `weights` makes each score count as that many observations (inverse
+        sampling probabilities under load shedding).
+        """
+        if not len(ts):
+            return
+        newest = ts.max()
+        if self.head is None or int(newest // self.width) > self.head:
+            self.advance(newest)
+        buckets = (ts // self.width).astype(np.int64)
+        keep = buckets > self.head - self.n
+        if not keep.all():
+            ts, scores, buckets = ts[keep], scores[keep], buckets[keep]
+            topic_idx = topic_idx[keep] if topic_idx is not None else None
+            weights = weights[keep] if weights is not None else None
+            if not len(ts):
+                return
+        w = np.ones(len(ts)) if weights is None else weights
+        weighted = w * scores
+        slots = buckets % self.n
+        np.add.at(self.counts, slots, w)
+        np.add.at(self.sums, slots, weighted)
+        self.count += w.sum()
+        self.total += weighted.sum()
+        if topic_idx is not None:
+            if topic_idx.max() >= self.topic_counts.shape[1]:
+                self._grow_topics(int(topic_idx.max()) + 1)
+            cols = self.topic_counts.shape[1]
+            np.add.at(self.topic_counts, (slots, topic_idx), w)
+            np.add.at(self.topic_sums, (slots, topic_idx), weighted)
+            self.topic_count_totals += np.bincount(topic_idx, weights=w, minlength=cols)
+            self.topic_sum_totals += np.bincount(topic_idx, weights=weighted, minlength=cols)
+
+        # time-decayed EWMA: everything decayed to the newest timestamp seen
+        ref = ts.max() if self._ewma_ts is None else max(self._ewma_ts, ts.max())
+        if self._ewma_ts is not None:
+            decay = math.exp(-(ref - self._ewma_ts) / self.seconds)
+            self._ewma_num *= decay
+            self._ewma_den *= decay
+        decay = w * np.exp(-(ref - ts) / self.seconds)
+        self._ewma_num += float(decay @ scores)
+        self._ewma_den += float(decay.sum())
+        self._ewma_ts = ref
+
+    def snapshot(self, topics):
+        count = int(round(self.count))
+        per_topic = {}
+        for name, idx in topics.items():
+            if idx < len(self.topic_count_totals):
+                c = self.topic_count_totals[idx]
+                if round(c):
+                    per_topic[name] = {"count": int(round(c)), "mean": float(self.topic_sum_totals[idx] / c)}
+        return {
+            "count": count,
+            "mean": float(self.total / self.count) if count else 0.0,
+            "ewma": float(self._ewma_num / self._ewma_den) if self._ewma_den else 0.0,
+            "topics": per_topic
+        }
+
+
+class WindowAggregator:
+    """Several concurrent rolling windows (1m/15m/1h/24h by default) fed from one stream."""
+
+    def __init__(self, windows=None, buckets=60):
+        self.windows = {name: RollingWindow(seconds, buckets)
+                        for name, seconds in (windows or DEFAULT_WINDOWS).items()}
+        self.topics = {}   # topic label -> column index
+        self.total_added = 0
+        self._lock = threading.Lock()
+
+    @property
+    def empty(self):
+        return self.total_added == 0
+
+    def add_many(self, ts, scores, topics=None, now=None, weights=None):
+        """Record arrays of scores at epoch seconds `ts` (clamped to `now`), with optional topic labels and weights."""
+        now = time.time() if now is None else now
+        ts = np.minimum(np.asarray(ts, dtype=np.float64), now)
+        scores = np.asarray(scores, dtype=np.float64)
+        weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        with self._lock:
+            idx = None
+            if topics is not None:
+                labels, inverse = np.unique(np.asarray(topics), return_inverse=True)
+                columns = np.array([self.topics.setdefault(t, len(self.topics)) for t in labels.tolist()])
+                idx = columns[inverse.ravel()]
+            for window in self.windows.values():
+                window.add_many(ts, scores, idx, weights)
+            self.total_added += len(ts)
+
+    def window_for(self, seconds):
+        for name, window in self.windows.items():
+            if window.seconds == seconds:
+                return name
+        return None
+
+    def snapshot(self, name=None, now=None):
+        """Stats for one window, or all windows keyed by name."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for window in self.windows.values():
+                window.advance(now)
+            if name is not None:
+                return self.windows[name].snapshot(self.topics)
+            return {n: w.snapshot(self.topics) for n, w in self.windows.items()}
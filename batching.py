@@ -0,0 +1,91 @@
+import numpy as np
+
+
+def plan_batches(lengths, token_budget=8192, max_batch_size=64):
+    """
+    Group item indices into batches of similar token length so that
+    batch_size * longest_item stays within `token_budget`.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, current = [], []
+    for i in order:
+        # items arrive in ascending length, so lengths[i] is the padded length
+        if current and (len(current) >= max_batch_size or (len(current) + 1) * lengths[i] > token_budget):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+class BucketedBatcher:
+    """
+    Runs a transformer call over length-bucketed batches and restores the
+    original order. `stats` holds the padding efficiency of the last run
+    (real tokens / padded tokens).
+    """
+
+    def __init__(self, tokenizer, token_budget=8192, max_batch_size=64, max_length=256):
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.max_length = max_length
+        self.stats = {}
+
+    def lengths(self, texts):
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def run(self, texts, fn, map_fn=None, max_batch_size=None):
+        """
+        Call fn(batch_texts) -> list of results per bucket; return results in input order.
+        With map_fn (e.g. a process pool's map) buckets are dispatched together;
+        max_batch_size caps the bucket size so there are enough shards to go round.
+        """
+        if not texts:
+            self.stats = {"batches": 0, "tokens": 0, "padded_tokens": 0, "efficiency": 1.0}
+            return []
+        lengths = self.lengths(texts)
+        results = [None] * len(texts)
+        tokens = padded = 0
+        batches = plan_batches(lengths, self.token_budget, min(self.max_batch_size, max_batch_size or self.max_batch_size))
+        shards = [[texts[i] for i in batch] for batch in batches]
+        outputs = map_fn(fn, shards) if map_fn else (fn(shard) for shard in shards)
+        for batch, out in zip(batches, outputs):
+            for i, res in zip(batch, out):
+                results[i] = res
+            tokens += sum(lengths[i] for i in batch)
+            padded += len(batch) * max(lengths[i] for i in batch)
+        self.stats = {
+            "batches": len(batches),
+            "tokens": tokens,
+            "padded_tokens": padded,
+            "efficiency": round(tokens / padded, 3) if padded else 1.0
+        }
+        return results
+
+
+class BucketedEncoder:
+    """
+    SentenceTransformer-compatible `encode` that runs through a BucketedBatcher,
+    optionally sharding the buckets across an InferencePool.
+    """
+
+    def __init__(self, model, batcher, pool=None):
+        self.model = model
+        self.batcher = batcher
+        self.pool = pool
+
+    def encode(self, texts, convert_to_numpy=True):
+        texts = list(texts)
+        pool = self.pool() if callable(self.pool) else self.pool
+        if pool:
+            from worker_pool import embed
+            rows = self.batcher.run(texts, embed, map_fn=pool.map, max_batch_size=pool.shard_size(len(texts)))
+        else:
+            rows = self.batcher.run(
+                texts,
+                lambda batch: self.model.encode(batch, batch_size=len(batch), convert_to_numpy=True)
+            )
+        return np.vstack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
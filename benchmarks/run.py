@@ -0,0 +1,244 @@
+"""
+Benchmark the NLP hot path and end-to-end Streamer throughput.
+
+    python -m benchmarks.run --tweets 2000 --batch-sizes 10 50 200 --output bench.json
+    python -m benchmarks.run --compare bench_before.json bench_after.json
+
+Uses the offline stand-in models from benchmarks/stand_ins.py unless
+--real-models is given. Reports tweets/sec, p50/p95/p99 latency per stage
+and peak RSS for each batch size, and writes everything to JSON so runs can
+be compared between commits. Each batch size runs in its own spawned
+process, so its peak RSS doesn't include the earlier runs.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")   # keep per-batch logging out of the timings
+
+from benchmarks import stand_ins  # noqa: E402
+
+STAGES = ("sentiment", "fit_topics", "get_topic_info", "aggregation", "process_batch")
+
+SUBJECTS = ["$AAPL", "$TSLA", "$NVDA", "Bitcoin", "Ethereum", "Gold", "Oil", "The Fed", "EUR/USD",
+            "The S&P 500", "Nasdaq", "Treasury yields", "Mortgage rates", "Bank stocks", "CPI"]
+VERBS = ["rallies", "tumble", "slides", "surge", "holds steady", "beats estimates", "misses guidance",
+         "drop", "hits a record", "gains", "stays flat"]
+CONTEXT = ["after the earnings report", "as inflation cools", "on rate hike fears", "ahead of the FOMC meeting",
+           "amid merger talk", "as demand weakens", "on strong retail sales", "after new regulation news",
+           "as crypto markets turn bullish", "on supply concerns", "with consumer spending up"]
+FILLER = ["analysts say", "traders watch", "volume is heavy", "more to come", "big week ahead",
+          "this could change everything", "watch the open", "not financial advice", "thread below"]
+
+
+# ---------------- Corpus ---------------- #
+def make_corpus(n, mean_words=18, sigma=0.5, duplicate_rate=0.1, seed=42):
+    """Synthetic financial tweets with log-normal word counts and a share of exact reposts."""
+    rng = random.Random(seed)
+    lengths = np.random.default_rng(seed).lognormal(np.log(mean_words), sigma, n).astype(int)
+    start = datetime.now(timezone.utc) - timedelta(minutes=30)
+    tweets = []
+    for i in range(n):
+        if tweets and rng.random() < duplicate_rate:
+            text = rng.choice(tweets)["text"]
+        else:
+            words = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(CONTEXT)}".split()
+            while len(words) < max(lengths[i], 4):
+                words += rng.choice(FILLER + CONTEXT).split()
+            text = " ".join(words[:max(lengths[i], 4)])
+            if rng.random() < 0.3:
+                text += f" https://t.co/{rng.getrandbits(32):x}"
+        tweets.append({
+            "id": str(10 ** 15 + i),
+            "text": text,
+            "created_at": (start + timedelta(seconds=i * 1800 / n)).isoformat(),
+            "public_metrics": {"like_count": rng.randint(0, 500), "retweet_count": rng.randint(0, 100)}
+        })
+    return tweets
+
+
+# ---------------- Measurement ---------------- #
+def peak_rss_mb():
+    """High-water RSS of this process so far."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    arr = np.array(samples) * 1000
+    return {
+        "n": len(samples),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def timed(samples, fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    samples.append(time.perf_counter() - start)
+    return out
+
+
+def new_pipeline(real_models):
+    import main
+    from nlp_pipeline import NLPPipeline
+    nlp = NLPPipeline(device=-1, topic_warmup=100, topic_refit_interval=3600)
+    if not real_models:
+        stand_ins.install(nlp)
+    main.nlp = nlp   # Streamer.process_batch uses the module-level pipeline
+    return nlp
+
+
+def new_streamer():
+    import main
+    # an empty demo file keeps the Streamer from loading the demo dataset
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        f.write('{"data": []}')
+    try:
+        return main.Streamer(demo_mode=True, demo_file=f.name)
+    finally:
+        os.unlink(f.name)
+
+
+def run_batch_size(corpus, batch_size, real_models):
+    rss_start = peak_rss_mb()
+    batches = [corpus[i:i + batch_size] for i in range(0, len(corpus), batch_size)]
+    samples = {stage: [] for stage in STAGES}
+
+    # stage by stage, each on a fresh pipeline so caches start cold
+    nlp = new_pipeline(real_models)
+    streamer = new_streamer()
+    for batch in batches:
+        texts = [t["text"] for t in batch]
+        sent = timed(samples["sentiment"], nlp.analyze_sentiment, texts)
+        topics, _ = timed(samples["fit_topics"], nlp.fit_topics, texts)
+        timed(samples["get_topic_info"], nlp.get_topic_info, texts, topics)
+
+        def aggregate():
+            streamer.assemble(batch, sent, topics)
+            return streamer.get_aggregate_snapshot()
+        timed(samples["aggregation"], aggregate)
+
+    # end to end through Streamer.process_batch
+    new_pipeline(real_models)
+    streamer = new_streamer()
+    processed = 0
+    start = time.perf_counter()
+    for batch in batches:
+        out, _ = timed(samples["process_batch"], streamer.process_batch, [dict(t) for t in batch])
+        processed += len(out)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "batch_size": batch_size,
+        "batches": len(batches),
+        "tweets": processed,
+        "tweets_per_sec": round(processed / elapsed, 2) if elapsed else 0.0,
+        "stages": {stage: percentiles(s) for stage, s in samples.items()},
+        "start_rss_mb": round(rss_start, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run_isolated(corpus, batch_size, real_models):
+    """run_batch_size in a fresh spawned process, so ru_maxrss covers this batch size only."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_batch_size, corpus, batch_size, real_models).result()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+# ---------------- Comparison ---------------- #
+def compare(before_path, after_path):
+    with open(before_path, "r", encoding="utf-8") as f:
+        before = {r["batch_size"]: r for r in json.load(f)["results"]}
+    with open(after_path, "r", encoding="utf-8") as f:
+        after = json.load(f)["results"]
+
+    print(f"{'batch':>6} {'metric':<28} {'before':>12} {'after':>12} {'change':>9}")
+    for result in after:
+        old = before.get(result["batch_size"])
+        if not old:
+            continue
+        rows = [("tweets_per_sec", old["tweets_per_sec"], result["tweets_per_sec"])]
+        for stage in STAGES:
+            if stage in old["stages"] and stage in result["stages"]:
+                rows.append((f"{stage} p95_ms", old["stages"][stage].get("p95_ms"),
+                             result["stages"][stage].get("p95_ms")))
+        for name, a, b in rows:
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"{result['batch_size']:>6} {name:<28} {a:>12} {b:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=1000, help="corpus size")
+    parser.add_argument("--mean-words", type=float, default=18, help="mean tweet length in words")
+    parser.add_argument("--length-sigma", type=float, default=0.5, help="log-normal sigma of tweet length")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="share of exact reposts")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--real-models", action="store_true", help="load the real transformer models")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    corpus = make_corpus(args.tweets, args.mean_words, args.length_sigma, args.duplicate_rate, args.seed)
+    results = []
+    for batch_size in args.batch_sizes:
+        result = run_isolated(corpus, batch_size, args.real_models)
+        results.append(result)
+        stages = ", ".join(f"{s} p95={v['p95_ms']}ms" for s, v in result["stages"].items() if v)
+        print(f"batch={batch_size}: {result['tweets_per_sec']} tweets/s, {stages}, "
+              f"peak RSS {result['peak_rss_mb']} MB (from {result['start_rss_mb']} MB)", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "models": "real" if args.real_models else "stand-in",
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
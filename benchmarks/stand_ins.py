@@ -0,0 +1,134 @@
+"""
+Small, deterministic stand-ins for the transformer models so the benchmarks
+run offline. Each one does NumPy work proportional to the padded token count
+of the batch it gets, so batching and padding changes show up in the numbers
+the way they would with the real models.
+"""
+import hashlib
+
+import numpy as np
+
+HIDDEN = 64
+EMBED_DIM = 384
+
+
+def _token_id(word):
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+class StandInTokenizer:
+    model_max_length = 1024
+
+    def __call__(self, texts, truncation=True, max_length=None, **kwargs):
+        max_length = max_length or self.model_max_length
+        ids = [[_token_id(w) for w in t.lower().split()][:max_length] or [0] for t in texts]
+        return {"input_ids": ids}
+
+
+class _Encoder:
+    """Fixed random layer applied to every padded token position."""
+
+    def __init__(self, seed):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.standard_normal((HIDDEN, HIDDEN)).astype(np.float32) / HIDDEN
+        self.tokenizer = StandInTokenizer()
+
+    def hidden(self, texts, max_length, layers=4):
+        ids = self.tokenizer(texts, max_length=max_length)["input_ids"]
+        width = max(len(x) for x in ids)
+        x = np.zeros((len(ids), width, HIDDEN), dtype=np.float32)
+        for i, row in enumerate(ids):
+            for j, tok in enumerate(row):
+                x[i, j, tok % HIDDEN] = 1.0
+        for _ in range(layers):
+            x = np.tanh(x @ self.weights)
+        lengths = np.array([len(r) for r in ids], dtype=np.float32)[:, None]
+        return x.sum(axis=1) / lengths, ids
+
+
+class StandInSentiment(_Encoder):
+    """Mimics the HF sentiment-analysis pipeline: list of {"label", "score"}."""
+
+    POSITIVE = {"rally", "rallies", "beats", "surge", "record", "bullish", "gains", "up", "strong"}
+    NEGATIVE = {"tumble", "slides", "drop", "miss", "bearish", "fears", "layoffs", "down", "weak"}
+
+    def __init__(self):
+        super().__init__(seed=1)
+
+    def __call__(self, texts, truncation=True, batch_size=None, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        pooled, _ = self.hidden(texts, 256, layers=6)
+        out = []
+        for text, vec in zip(texts, pooled):
+            words = set(text.lower().split())
+            pos, neg = len(words & self.POSITIVE), len(words & self.NEGATIVE)
+            label = "LABEL_2" if pos > neg else "LABEL_0" if neg > pos else "LABEL_1"
+            out.append({"label": label, "score": float(0.5 + 0.5 / (1 + abs(vec[0])))})
+        return out
+
+
+class StandInEmbedder(_Encoder):
+    """Mimics SentenceTransformer.encode: normalized (n, 384) float32 array."""
+
+    max_seq_length = 256
+
+    def __init__(self):
+        super().__init__(seed=2)
+        rng = np.random.default_rng(3)
+        self.projection = rng.standard_normal((HIDDEN, EMBED_DIM)).astype(np.float32)
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, **kwargs):
+        if not texts:
+            return np.zeros((0, EMBED_DIM), dtype=np.float32)
+        pooled, _ = self.hidden(list(texts), self.max_seq_length, layers=3)
+        vecs = pooled @ self.projection
+        return vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-6)
+
+
+class StandInSummarizer(_Encoder):
+    """Mimics the summarization pipeline: first words of each input."""
+
+    def __init__(self):
+        super().__init__(seed=4)
+
+    def __call__(self, texts, max_length=20, batch_size=None, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.hidden(texts, self.tokenizer.model_max_length, layers=12)
+        return [{"summary_text": " ".join(t.split()[:max_length])} for t in texts]
+
+
+class StandInTopicModel:
+    """Mimics BERTopic's fit with a few rounds of k-means on the embeddings (no cluster terms)."""
+
+    def __init__(self, n_topics=12):
+        self.n_topics = n_topics
+        self.centroids = None
+
+    def fit(self, docs, embeddings=None):
+        rng = np.random.default_rng(0)
+        k = min(self.n_topics, len(embeddings))
+        centroids = embeddings[rng.choice(len(embeddings), k, replace=False)]
+        for _ in range(10):
+            assign = (embeddings @ centroids.T).argmax(axis=1)
+            for c in range(k):
+                members = embeddings[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        self.centroids = centroids
+        return self
+
+    def get_topics(self):
+        return {}
+
+
+def install(nlp):
+    """Swap the stand-ins into an NLPPipeline."""
+    nlp.use_models(
+        sentiment=StandInSentiment(),
+        summarizer=StandInSummarizer(),
+        embedder=StandInEmbedder(),
+        topic_model_factory=StandInTopicModel
+    )
+    return nlp
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+RETWEET_RE = re.compile(r"^rt @\w+:?\s*")
+CASHTAG_RE = re.compile(r"\$[a-z][a-z0-9._]*")
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text, strip_cashtags=False):
+    """Lowercase, drop retweet prefixes and URLs (optionally cashtags) and collapse whitespace."""
+    text = (text or "").lower()
+    text = RETWEET_RE.sub("", text)
+    text = URL_RE.sub(" ", text)
+    if strip_cashtags:
+        text = CASHTAG_RE.sub(" ", text)
+    return SPACE_RE.sub(" ", text).strip()
+
+
+def text_key(text, strip_cashtags=False):
+    """Stable hash of the normalized text, used as the cache key."""
+    norm = normalize_text(text, strip_cashtags=strip_cashtags)
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ---------------- Embeddings ---------------- #
+class EmbeddingCache:
+    """
+    Bounded LRU cache of sentence embeddings keyed by normalized text hash.
+
+    Vectors live in a preallocated float16 array. When `path` is given the
+    array is a memory-mapped file and the hash index is written next to it,
+    so the cache survives restarts.
+    """
+
+    def __init__(self, encoder, capacity=50000, path=None, flush_every=1000):
+        self.encoder = encoder
+        self.capacity = capacity
+        self.path = path
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._index = OrderedDict()   # key -> row in self._vectors, in LRU order
+        self._vectors = None
+        self._dim = None
+        self._dirty = 0
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    # ---- storage ---- #
+    def _index_path(self):
+        return self.path + ".idx.json"
+
+    def _allocate(self, dim, mode="w+"):
+        self._dim = dim
+        if self.path:
+            self._vectors = np.memmap(self.path, dtype=np.float16, mode=mode, shape=(self.capacity, dim))
+        else:
+            self._vectors = np.zeros((self.capacity, dim), dtype=np.float16)
+
+    def _load(self):
+        if not (os.path.exists(self.path) and os.path.exists(self._index_path())):
+            return
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("capacity") != self.capacity:
+                logger.info("Embedding cache capacity changed, starting empty")
+                return
+            self._allocate(meta["dim"], mode="r+")
+            self._index = OrderedDict((k, row) for k, row in meta["index"])
+            logger.info("Loaded %d cached embeddings from %s", len(self._index), self.path)
+        except Exception as e:
+            logger.warning("Error loading embedding cache: %s", e)
+            self._index = OrderedDict()
+            self._vectors = None
+
+    def flush(self):
+        """Persist the memmap and hash index (no-op for in-memory caches)."""
+        if not self.path or self._vectors is None:
+            return
+        with self._lock:
+            self._vectors.flush()
+            meta = {"dim": self._dim, "capacity": self.capacity, "index": list(self._index.items())}
+            tmp = self._index_path() + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self._index_path())
+            self._dirty = 0
+
+    def _store(self, key, vector):
+        if key in self._index:
+            return
+        if len(self._index) >= self.capacity:
+            _, row = self._index.popitem(last=False)
+        else:
+            row = len(self._index)
+        self._vectors[row] = vector
+        self._index[key] = row
+        self._dirty += 1
+
+    # ---- lookup ---- #
+    def encode(self, texts):
+        """Return float32 embeddings for texts, encoding only cache misses."""
+        keys = [text_key(t) for t in texts]
+        out = [None] * len(texts)
+        pending = {}   # key -> (text, [positions]) for misses, deduplicated
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._index.get(key)
+                if row is not None:
+                    self._index.move_to_end(key)
+                    out[i] = self._vectors[row].astype(np.float32)
+                    self.hits += 1
+                elif key in pending:
+                    pending[key][1].append(i)
+                    self.hits += 1
+                else:
+                    pending[key] = (texts[i], [i])
+                    self.misses += 1
+
+        if pending:
+            new_keys = list(pending)
+            vectors = np.asarray(
+                self.encoder.encode([pending[k][0] for k in new_keys], convert_to_numpy=True),
+                dtype=np.float32
+            )
+            with self._lock:
+                if self._vectors is None:
+                    self._allocate(vectors.shape[1])
+                for key, vec in zip(new_keys, vectors):
+                    self._store(key, vec)
+                    for i in pending[key][1]:
+                        out[i] = vec
+            if self.path and self._dirty >= self.flush_every:
+                self.flush()
+
+        if not out:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.vstack(out)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._index),
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# ---------------- Sentiment ---------------- #
+def simhash(text, bits=64):
+    """64-bit SimHash over word unigrams and bigrams of already-normalized text."""
+    words = text.split()
+    features = words + [a + " " + b for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    weights = [0] * bits
+    for feat in features:
+        h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "big")
+        for b in range(bits):
+            weights[b] += 1 if (h >> b) & 1 else -1
+    value = 0
+    for b in range(bits):
+        if weights[b] > 0:
+            value |= 1 << b
+    return value
+
+
+class SentimentCache:
+    """
+    Memo layer for sentiment results. Texts are normalized (URLs, cashtags and
+    whitespace stripped) and looked up by exact hash first, then optionally by
+    SimHash near-duplicate search over a banded index. Near-duplicate lookup
+    is off by default: a one-word edit ("beats" -> "misses") in a long tweet
+    can stay within a few bits and flip the label.
+    """
+
+    BANDS = 4
+    BAND_BITS = 16
+
+    def __init__(self, capacity=100000, near_duplicates=False, max_distance=1):
+        self.capacity = capacity
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (result, simhash)
+        self._bands = [dict() for _ in range(self.BANDS)]   # band value -> set of keys
+        self._lock = threading.Lock()
+
+    def _band_values(self, sig):
+        mask = (1 << self.BAND_BITS) - 1
+        return [(sig >> (i * self.BAND_BITS)) & mask for i in range(self.BANDS)]
+
+    def _near_lookup(self, sig):
+        best, best_dist = None, self.max_distance + 1
+        for band, value in zip(self._bands, self._band_values(sig)):
+            for key in band.get(value, ()):
+                dist = bin(self._entries[key][1] ^ sig).count("1")
+                if dist < best_dist:
+                    best, best_dist = key, dist
+        return best
+
+    def lookup(self, text):
+        """Return (key, cached result or None). The key is reused by `store`."""
+        norm = normalize_text(text, strip_cashtags=True)
+        key = hashlib.blake2b(norm.encode("utf-8"), digest_size=16).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return key, entry[0]
+            if self.near_duplicates and norm:
+                near = self._near_lookup(simhash(norm))
+                if near is not None:
+                    self._entries.move_to_end(near)
+                    self.near_hits += 1
+                    return key, self._entries[near][0]
+            self.misses += 1
+        return key, None
+
+    def store(self, key, text, result):
+        sig = simhash(normalize_text(text, strip_cashtags=True)) if self.near_duplicates else 0
+        with self._lock:
+            if key in self._entries:
+                return
+            if len(self._entries) >= self.capacity:
+                old_key, (_, old_sig) = self._entries.popitem(last=False)
+                if self.near_duplicates:
+                    for band, value in zip(self._bands, self._band_values(old_sig)):
+                        members = band.get(value)
+                        if members:
+                            members.discard(old_key)
+                            if not members:
+                                del band[value]
+            self._entries[key] = (result, sig)
+            if self.near_duplicates:
+                for band, value in zip(self._bands, self._band_values(sig)):
+                    band.setdefault(value, set()).add(key)
+
+    def stats(self):
+        total = self.exact_hits + self.near_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": round((self.exact_hits + self.near_hits) / total, 4) if total else 0.0
+        }
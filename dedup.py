@@ -0,0 +1,67 @@
+import sys
+import time
+from collections import deque
+
+# The recent search endpoint only returns tweets from the last 7 days,
+# so an ID older than that can never come back.
+RECENT_SEARCH_HORIZON = 7 * 24 * 3600
+
+
+class ExpiringIdSet:
+    """
+    Dedup set with a memory ceiling. IDs are grouped into time buckets and
+    whole buckets are dropped once they are older than `horizon` seconds, or
+    early (oldest first) when more than `max_ids` IDs are held. Membership is
+    a single dict lookup.
+    """
+
+    def __init__(self, horizon=RECENT_SEARCH_HORIZON, bucket_seconds=3600, max_ids=1_000_000):
+        self.horizon = horizon
+        self.bucket_seconds = bucket_seconds
+        self.max_ids = max_ids
+        self._ids = {}            # id -> bucket it was added in
+        self._buckets = deque()   # (bucket, [ids]) oldest first
+        self._payload_bytes = 0
+
+    def __contains__(self, item):
+        return item in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _drop_oldest(self):
+        bucket, ids = self._buckets.popleft()
+        for item in ids:
+            if self._ids.get(item) == bucket:
+                del self._ids[item]
+                self._payload_bytes -= sys.getsizeof(item)
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        oldest_kept = int((now - self.horizon) // self.bucket_seconds)
+        while self._buckets and self._buckets[0][0] < oldest_kept:
+            self._drop_oldest()
+
+    def add(self, item, now=None):
+        """Add item; return True if it was not already present."""
+        if item in self._ids:
+            return False
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != bucket:
+            self._buckets.append((bucket, []))
+            self.expire(now)
+        self._buckets[-1][1].append(item)
+        self._ids[item] = bucket
+        self._payload_bytes += sys.getsizeof(item)
+        while len(self._ids) > self.max_ids and len(self._buckets) > 1:
+            self._drop_oldest()
+        return True
+
+    def memory_bytes(self):
+        """Approximate memory held by the index, bucket lists and the IDs themselves."""
+        buckets = sum(sys.getsizeof(ids) for _, ids in self._buckets)
+        return sys.getsizeof(self._ids) + sys.getsizeof(self._buckets) + buckets + self._payload_bytes
+
+    def stats(self):
+        return {"ids": len(self._ids), "buckets": len(self._buckets), "memory_bytes": self.memory_bytes()}
@@ -0,0 +1,116 @@
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """
+    Append-only in-memory log of processed tweets with monotonically
+    increasing offsets, so any number of dashboards and downstream jobs can
+    read the same stream without consuming it.
+
+    Entries are kept until `max_entries` or `max_age` seconds is exceeded.
+    Offsets are contiguous, so "everything after offset X" is an O(1) index
+    computation followed by a slice. Named consumers can keep a server-side
+    cursor with `poll`. With `spill_path` every entry is also appended to a
+    local JSONL file.
+    """
+
+    def __init__(self, max_entries=10000, max_age=3600, spill_path=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.spill_path = spill_path
+        self._items = []        # (offset, appended_at, event)
+        self._start = 0         # index of the oldest retained entry in _items
+        self._next_offset = 0
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    # ---------------- Writes ---------------- #
+    def append_many(self, events):
+        """Append events, tagging each with its offset. Returns the tagged events."""
+        now = time.time()
+        tagged = []
+        with self._lock:
+            for event in events:
+                event = dict(event, offset=self._next_offset)
+                self._items.append((self._next_offset, now, event))
+                tagged.append(event)
+                self._next_offset += 1
+            self._evict(now)
+            if self.spill_path and tagged:
+                self._spill(tagged)
+        return tagged
+
+    def append(self, event):
+        return self.append_many([event])[0]["offset"]
+
+    def _evict(self, now):
+        retained = len(self._items) - self._start
+        cutoff = now - self.max_age if self.max_age else None
+        while retained > 0:
+            _, ts, _ = self._items[self._start]
+            if retained > self.max_entries or (cutoff is not None and ts < cutoff):
+                self._start += 1
+                retained -= 1
+            else:
+                break
+        # compact once the dead prefix dominates, keeping eviction amortized O(1)
+        if self._start > 1024 and self._start * 2 > len(self._items):
+            del self._items[:self._start]
+            self._start = 0
+
+    def _spill(self, events):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event, default=str) + "\n")
+        except Exception as e:
+            logger.warning("Error spilling event log: %s", e)
+
+    def clear(self):
+        """Drop retained entries; offsets keep increasing."""
+        with self._lock:
+            self._items = []
+            self._start = 0
+
+    # ---------------- Reads ---------------- #
+    @property
+    def last_offset(self):
+        return self._next_offset - 1
+
+    @property
+    def first_offset(self):
+        with self._lock:
+            if self._start < len(self._items):
+                return self._items[self._start][0]
+            return self._next_offset
+
+    def read_after(self, offset=None, limit=None):
+        """Events with offset > `offset` (all retained events if None)."""
+        with self._lock:
+            self._evict(time.time())
+            if self._start >= len(self._items):
+                return []
+            first = self._items[self._start][0]
+            begin = self._start if offset is None else self._start + max(offset + 1 - first, 0)
+            end = len(self._items) if limit is None else min(begin + limit, len(self._items))
+            return [event for _, _, event in self._items[begin:end]]
+
+    def poll(self, consumer, limit=None):
+        """Read the next events for a named consumer and advance its cursor."""
+        events = self.read_after(self._cursors.get(consumer), limit)
+        if events:
+            self._cursors[consumer] = events[-1]["offset"]
+        return events
+
+    def stats(self):
+        with self._lock:
+            return {
+                "retained": len(self._items) - self._start,
+                "last_offset": self._next_offset - 1,
+                "consumers": len(self._cursors)
+            }
@@ -0,0 +1,247 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OVERALL = "__all__"
+
+
+class HoltState:
+    """
+    Damped Holt (level + trend) smoothing of one topic's per-bucket mean
+    sentiment. Each closed bucket is an O(1) update; empty buckets just
+    project the level forward along the damped trend.
+    """
+
+    def __init__(self, alpha=0.3, beta=0.1, phi=0.9):
+        self.alpha = alpha
+        self.beta = beta
+        self.phi = phi
+        self.level = None
+        self.trend = 0.0
+        self.sq_error = 0.0   # EWMA of squared one-step-ahead errors
+        self.bucket = None
+        self.count = 0
+
+    def update(self, bucket, value):
+        if self.level is None:
+            self.level, self.bucket = value, bucket
+            self.count = 1
+            return
+        for _ in range(min(bucket - self.bucket - 1, 100)):
+            self.level += self.phi * self.trend
+            self.trend *= self.phi
+        predicted = self.level + self.phi * self.trend
+        error = value - predicted
+        self.sq_error = (1 - self.alpha) * self.sq_error + self.alpha * error * error
+        level = self.alpha * value + (1 - self.alpha) * predicted
+        self.trend = self.beta * (level - self.level) + (1 - self.beta) * self.phi * self.trend
+        self.level = level
+        self.bucket = bucket
+        self.count += 1
+
+    def forecast(self, steps):
+        """(mean, half-width of a ~95% interval) for 1..steps buckets ahead."""
+        out = []
+        damp = 0.0
+        sigma = math.sqrt(self.sq_error)
+        for h in range(1, steps + 1):
+            damp += self.phi ** h
+            mean = max(-1.0, min(1.0, self.level + damp * self.trend))
+            out.append((mean, 1.96 * sigma * math.sqrt(h)))
+        return out
+
+
+class SentimentForecaster:
+    """
+    Short-horizon sentiment forecasts per topic (and overall).
+
+    `observe` takes the scores of each processed batch, sums them into
+    `bucket_seconds` buckets and, as buckets close, updates a HoltState per
+    topic and rebuilds the cached forecast. When `prophet` is importable, a
+    background thread refits a Prophet model per topic every
+    `prophet_interval` seconds on the stored bucket history; its forecasts
+    replace the Holt ones until they go stale. `forecast()` only ever
+    returns the cache.
+    """
+
+    def __init__(self, bucket_seconds=300, horizon=12, history=288, alpha=0.3, beta=0.1, phi=0.9,
+                 prophet_interval=1800, min_prophet_points=48, max_topics=50):
+        self.bucket_seconds = bucket_seconds
+        self.horizon = horizon                  # buckets ahead
+        self.history = history                  # closed buckets kept per topic for Prophet
+        self.params = (alpha, beta, phi)
+        self.prophet_interval = prophet_interval
+        self.min_prophet_points = min_prophet_points
+        self.max_topics = max_topics
+        self.states = {}                        # topic -> HoltState
+        self.series = {}                        # topic -> deque of (bucket, mean, count)
+        self.open = {}                          # bucket -> {topic: [sum, count]}
+        self.newest = None
+        self.late = 0
+        self.prophet = {}                       # topic -> (fitted_at, [(bucket, mean, lower, upper)])
+        self.prophet_available = None
+        self.last_prophet_fit = 0.0
+        self._cache = self._empty()
+        self._lock = threading.Lock()
+        self._fitting = False
+
+    def _empty(self):
+        return {"bucket_seconds": self.bucket_seconds, "horizon": self.horizon,
+                "generated_at": None, "topics": {}}
+
+    # ---------------- Updates ---------------- #
+    def observe(self, ts, scores, topics, weights=None, now=None):
+        """
+        Add one batch of (epoch seconds, signed score, topic[, sample weight])
+        columns. Timestamps are clamped to `now`, so one future created_at
+        can't move the open bucket ahead and make every later tweet late.
+        """
+        now = time.time() if now is None else now
+        ts = np.minimum(np.asarray(ts, dtype=np.float64), now)
+        if not len(ts):
+            return
+        scores = np.asarray(scores, dtype=np.float64)
+        weights = np.ones(len(ts)) if weights is None else np.asarray(weights, dtype=np.float64)
+        buckets = (ts // self.bucket_seconds).astype(np.int64)
+        topics = np.asarray(topics).astype(str)
+        with self._lock:
+            newest = int(buckets.max())
+            if self.newest is None or newest > self.newest:
+                self.newest = newest
+            # the previous bucket stays open for stragglers; anything older was already closed
+            floor = self.newest - 1
+            late = buckets < floor
+            if late.any():
+                self.late += int(late.sum())
+                buckets, scores, topics, weights = buckets[~late], scores[~late], topics[~late], weights[~late]
+            if len(buckets):
+                self._accumulate(buckets, scores, weights, topics)
+                self._accumulate(buckets, scores, weights, np.full(len(buckets), OVERALL))
+            closed = sorted(b for b in self.open if b < floor)
+            for bucket in closed:
+                self._close(bucket, self.open.pop(bucket))
+            if closed:
+                self._rebuild()
+        if closed:
+            self._maybe_refit()
+
+    def _accumulate(self, buckets, scores, weights, keys):
+        """Sum weighted scores per (bucket, key) with one bincount instead of a loop over tweets."""
+        labels, codes = np.unique(keys, return_inverse=True)
+        width = len(labels)
+        base = int(buckets.min())
+        cells, inverse = np.unique((buckets - base) * width + codes.ravel(), return_inverse=True)
+        inverse = inverse.ravel()
+        sums = np.bincount(inverse, weights=weights * scores)
+        counts = np.bincount(inverse, weights=weights)
+        for cell, total, count in zip(cells.tolist(), sums.tolist(), counts.tolist()):
+            bucket, topic = base + cell // width, labels[cell % width]
+            acc = self.open.setdefault(bucket, {}).setdefault(str(topic), [0.0, 0.0])
+            acc[0] += total
+            acc[1] += count
+
+    def _close(self, bucket, cells):
+        for topic, (total, count) in cells.items():
+            if topic not in self.states:
+                if len(self.states) >= self.max_topics:
+                    continue
+                self.states[topic] = HoltState(*self.params)
+                self.series[topic] = deque(maxlen=self.history)
+            self.states[topic].update(bucket, total / count)
+            self.series[topic].append((bucket, total / count, count))
+
+    def _rebuild(self):
+        now = time.time()
+        topics = {}
+        for topic, state in self.states.items():
+            start = state.bucket
+            entry = {"model": "holt", "observations": state.count,
+                     "last": {"ts": start * self.bucket_seconds, "level": state.level}}
+            fitted = self.prophet.get(topic)
+            future = [p for p in fitted[1] if p[0] > start] if fitted else []
+            if fitted and now - fitted[0] < 2 * self.prophet_interval and len(future) >= self.horizon:
+                entry["model"] = "prophet"
+                entry["points"] = [{"ts": b * self.bucket_seconds, "mean": m, "lower": lo, "upper": hi}
+                                   for b, m, lo, hi in future[:self.horizon]]
+            else:
+                entry["points"] = [{"ts": (start + h) * self.bucket_seconds, "mean": m,
+                                    "lower": max(-1.0, m - w), "upper": min(1.0, m + w)}
+                                   for h, (m, w) in enumerate(state.forecast(self.horizon), 1)]
+            topics[topic] = entry
+        self._cache = dict(self._empty(), generated_at=now, topics=topics)
+
+    def forecast(self, topic=None):
+        cache = self._cache
+        if topic is None:
+            return cache
+        return dict(cache, topics={topic: cache["topics"][topic]} if topic in cache["topics"] else {})
+
+    # ---------------- Prophet ---------------- #
+    def _maybe_refit(self):
+        with self._lock:
+            if self._fitting or self.prophet_available is False:
+                return
+            if time.time() - self.last_prophet_fit < self.prophet_interval:
+                return
+            series = {t: list(s) for t, s in self.series.items() if len(s) >= self.min_prophet_points}
+            if not series:
+                return
+            self._fitting = True
+            self.last_prophet_fit = time.time()
+        worker = threading.Thread(target=self._refit, args=(series,), name="forecast-refit", daemon=True)
+        worker.start()
+
+    def _refit(self, series):
+        try:
+            try:
+                import pandas as pd
+                from prophet import Prophet
+                self.prophet_available = True
+            except ImportError:
+                logger.info("prophet not installed, forecasting with Holt smoothing only")
+                self.prophet_available = False
+                return
+            logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+            fitted = {}
+            for topic, points in series.items():
+                try:
+                    df = pd.DataFrame({
+                        "ds": pd.to_datetime([b * self.bucket_seconds for b, _, _ in points], unit="s"),
+                        "y": [m for _, m, _ in points]
+                    })
+                    model = Prophet(daily_seasonality=len(points) * self.bucket_seconds >= 2 * 86400,
+                                    weekly_seasonality=False, yearly_seasonality=False)
+                    model.fit(df)
+                    future = model.make_future_dataframe(periods=self.horizon * 2,
+                                                         freq=f"{self.bucket_seconds}s", include_history=False)
+                    pred = model.predict(future)
+                    buckets = ((pred["ds"] - pd.Timestamp(0)) // pd.Timedelta(seconds=self.bucket_seconds)).tolist()
+                    fitted[topic] = (time.time(), [
+                        (b, float(np.clip(m, -1, 1)), float(np.clip(lo, -1, 1)), float(np.clip(hi, -1, 1)))
+                        for b, m, lo, hi in zip(buckets, pred["yhat"], pred["yhat_lower"], pred["yhat_upper"])
+                    ])
+                except Exception as e:
+                    logger.warning("Prophet refit failed for topic %s: %s", topic, e)
+            with self._lock:
+                self.prophet.update(fitted)
+                self._rebuild()
+            logger.info("Prophet refitted for %d topics", len(fitted))
+        finally:
+            with self._lock:
+                self._fitting = False
+
+    def stats(self):
+        return {
+            "topics": len(self.states),
+            "open_buckets": len(self.open),
+            "late": self.late,
+            "prophet": {"available": self.prophet_available, "topics": len(self.prophet),
+                        "last_fit": self.last_prophet_fit or None}
+        }
@@ -0,0 +1,175 @@
+"""
+Selectable CPU inference backends for the sentiment model and the embedder.
+
+    torch      full-precision PyTorch (default)
+    quantized  dynamic int8 quantization of the Linear layers (PyTorch)
+    onnx       ONNX Runtime, exported once and cached under `cache_dir`
+
+Non-default backends are checked against the FP32 model on a fixed sample
+at startup; if label agreement or score drift is out of tolerance the FP32
+model is used instead.
+"""
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+BACKENDS = ("torch", "quantized", "onnx")
+
+PARITY_SAMPLE = [
+    "Fed signals another rate hike as inflation stays sticky",
+    "Bitcoin rallies 8% after ETF approval, bulls back in control",
+    "Apple beats earnings estimates, revenue up 6% year over year",
+    "Oil slides as OPEC+ output cut fails to impress traders",
+    "Markets flat ahead of CPI print tomorrow",
+    "Bank stocks tumble on fears of deposit outflows",
+    "Housing starts fall for the third straight month as mortgage rates climb",
+    "EUR/USD steady near 1.08, no surprises from the ECB",
+    "Layoffs announced at major tech firm, shares drop after hours",
+    "Strong jobs report lifts the S&P 500 to a record close",
+]
+
+# Minimum label agreement and maximum per-text score drift vs FP32
+MIN_LABEL_AGREEMENT = 0.9
+MAX_SCORE_DRIFT = 0.1
+MIN_EMBEDDING_COSINE = 0.98
+
+
+def _cache_path(cache_dir, model_name, backend):
+    return os.path.join(cache_dir, f"{model_name.replace('/', '--')}-{backend}")
+
+
+def _quantize(model, inplace=False):
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=inplace)
+
+
+# ---------------- Parity checks ---------------- #
+def sentiment_parity(reference, candidate, sample=PARITY_SAMPLE):
+    ref = reference(sample, truncation=True)
+    out = candidate(sample, truncation=True)
+    agree = [r["label"] == o["label"] for r, o in zip(ref, out)]
+    drift = [abs(r["score"] - o["score"]) for r, o in zip(ref, out)]
+    return {
+        "label_agreement": sum(agree) / len(agree),
+        "max_score_drift": max(drift),
+        "mean_score_drift": sum(drift) / len(drift),
+    }
+
+
+def embedding_parity(reference, candidate, sample=PARITY_SAMPLE):
+    ref = np.asarray(reference.encode(sample, convert_to_numpy=True), dtype=np.float32)
+    out = np.asarray(candidate.encode(sample, convert_to_numpy=True), dtype=np.float32)
+    cos = (ref * out).sum(axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(out, axis=1))
+    return {"min_cosine": float(cos.min()), "mean_cosine": float(cos.mean())}
+
+
+# ---------------- Builders ---------------- #
+# With verify=False (worker processes) only what the candidate needs is loaded:
+# the FP32 reference is built just for the parity check or as the fallback.
+def _sentiment_pipeline(model, tokenizer=None, device=-1):
+    from transformers import pipeline
+    return pipeline(
+        task="sentiment-analysis",
+        model=model,
+        tokenizer=tokenizer,
+        truncation=True,
+        max_length=256,
+        device=device
+    )
+
+
+def build_sentiment(backend="torch", device=-1, cache_dir=".model_cache", verify=True):
+    """Return (sentiment pipeline, report). verify=False skips the parity check."""
+    if backend == "torch":
+        return _sentiment_pipeline(SENTIMENT_MODEL, device=device), {"backend": "torch"}
+    if device != -1:
+        logger.warning("Backend '%s' is CPU only, using torch on device %s", backend, device)
+        return _sentiment_pipeline(SENTIMENT_MODEL, device=device), {"backend": "torch"}
+
+    reference = None
+    try:
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+        if verify:
+            reference = _sentiment_pipeline(SENTIMENT_MODEL)
+        tokenizer = reference.tokenizer if reference else AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+        if backend == "quantized":
+            if reference:
+                model = _quantize(reference.model)
+            else:
+                model = _quantize(AutoModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL), inplace=True)
+        elif backend == "onnx":
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            path = _cache_path(cache_dir, SENTIMENT_MODEL, "onnx")
+            if os.path.isdir(path):
+                model = ORTModelForSequenceClassification.from_pretrained(path)
+            else:
+                logger.info("Exporting %s to ONNX (one time) -> %s", SENTIMENT_MODEL, path)
+                model = ORTModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL, export=True)
+                model.save_pretrained(path)
+                tokenizer.save_pretrained(path)
+        else:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
+        candidate = _sentiment_pipeline(model, tokenizer)
+        if not verify:
+            return candidate, {"backend": backend}
+        parity = sentiment_parity(reference, candidate)
+    except Exception as e:
+        logger.warning("Sentiment backend '%s' unavailable, using torch: %s", backend, e)
+        return reference or _sentiment_pipeline(SENTIMENT_MODEL), {"backend": "torch", "error": str(e)}
+
+    report = {"backend": backend, **parity}
+    if parity["label_agreement"] < MIN_LABEL_AGREEMENT or parity["max_score_drift"] > MAX_SCORE_DRIFT:
+        logger.warning("Sentiment backend '%s' failed parity check %s, using torch", backend, parity)
+        report["backend"] = "torch"
+        return reference, report
+    logger.info("Sentiment backend '%s' passed parity check %s", backend, parity)
+    return candidate, report
+
+
+def build_embedder(backend="torch", cache_dir=".model_cache", verify=True):
+    """Return (SentenceTransformer, report). verify=False skips the parity check."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(EMBEDDING_MODEL), {"backend": "torch"}
+
+    reference = None
+    try:
+        if verify:
+            reference = SentenceTransformer(EMBEDDING_MODEL)
+        if backend == "quantized":
+            if reference:
+                candidate = _quantize(reference)
+            else:
+                candidate = _quantize(SentenceTransformer(EMBEDDING_MODEL), inplace=True)
+        elif backend == "onnx":
+            # needs sentence-transformers>=3.2 with the onnx extra
+            path = _cache_path(cache_dir, EMBEDDING_MODEL, "onnx")
+            if os.path.isdir(path):
+                candidate = SentenceTransformer(path, backend="onnx")
+            else:
+                logger.info("Exporting %s to ONNX (one time) -> %s", EMBEDDING_MODEL, path)
+                candidate = SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+                candidate.save_pretrained(path)
+        else:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        if not verify:
+            return candidate, {"backend": backend}
+        parity = embedding_parity(reference, candidate)
+    except Exception as e:
+        logger.warning("Embedding backend '%s' unavailable, using torch: %s", backend, e)
+        return reference or SentenceTransformer(EMBEDDING_MODEL), {"backend": "torch", "error": str(e)}
+
+    report = {"backend": backend, **parity}
+    if parity["min_cosine"] < MIN_EMBEDDING_COSINE:
+        logger.warning("Embedding backend '%s' failed parity check %s, using torch", backend, parity)
+        report["backend"] = "torch"
+        return reference, report
+    logger.info("Embedding backend '%s' passed parity check %s", backend, parity)
+    return candidate, report
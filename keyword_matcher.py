@@ -0,0 +1,71 @@
+import re
+from bisect import bisect_right
+
+
+class KeywordMatcher:
+    """
+    Precompiled, word-boundary aware keyword matcher for topic labels.
+
+    All keywords from the topic map are compiled into one alternation regex
+    (longest first), so a text is scanned once and every label it mentions is
+    scored. A keyword must start at a word boundary ("ai" doesn't match
+    "said") and may end in a plural "s"/"es" ("rate hikes", "mortgages"). Multi-word keywords weigh more than single words, and the default
+    label only wins when nothing more specific matched.
+    """
+
+    DEFAULT_WEIGHT = 0.5
+
+    def __init__(self, topic_map, default="Miscellaneous"):
+        self.default = default
+        self.labels = list(topic_map)
+        self._order = {label: i for i, label in enumerate(self.labels)}
+        self._keyword_labels = {}
+        for label, keywords in topic_map.items():
+            for kw in keywords:
+                kw = kw.lower().strip()
+                if kw:
+                    self._keyword_labels.setdefault(kw, []).append(label)
+
+        alternation = "|".join(re.escape(kw) for kw in sorted(self._keyword_labels, key=len, reverse=True))
+        self.pattern = re.compile(r"(?<!\w)(" + alternation + r")(?:e?s)?(?!\w)")
+
+    def _add(self, scores, keyword):
+        weight = len(keyword.split())
+        for label in self._keyword_labels[keyword]:
+            w = weight * self.DEFAULT_WEIGHT if label == self.default else weight
+            scores[label] = scores.get(label, 0) + w
+
+    def _rank(self, scores):
+        return sorted(scores.items(), key=lambda kv: (-kv[1], self._order[kv[0]]))
+
+    def scores(self, text):
+        """Return [(label, score), ...] for every label matched in text, best first."""
+        scores = {}
+        for m in self.pattern.finditer((text or "").lower()):
+            self._add(scores, m.group(1))
+        return self._rank(scores)
+
+    def label(self, text):
+        ranked = self.scores(text)
+        return ranked[0][0] if ranked else self.default
+
+    def label_many(self, texts):
+        """Label a whole batch with a single regex pass over the joined texts."""
+        if not texts:
+            return []
+        lowered = [(t or "").lower() for t in texts]
+        starts = []
+        pos = 0
+        for t in lowered:
+            starts.append(pos)
+            pos += len(t) + 1
+
+        per_text = [{} for _ in texts]
+        for m in self.pattern.finditer("\n".join(lowered)):
+            idx = bisect_right(starts, m.start()) - 1
+            self._add(per_text[idx], m.group(1))
+
+        labels = []
+        for scores in per_text:
+            labels.append(self._rank(scores)[0][0] if scores else self.default)
+        return labels
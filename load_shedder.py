@@ -0,0 +1,169 @@
+import logging
+import random
+import threading
+import time
+from heapq import heappush, heappushpop
+
+logger = logging.getLogger(__name__)
+
+
+def engagement(tweet):
+    """Likes + 2x retweets/quotes + replies from the X API public_metrics."""
+    if not isinstance(tweet, dict):
+        return 0
+    m = tweet.get("public_metrics") or {}
+    return (m.get("like_count", 0) + 2 * (m.get("retweet_count", 0) + m.get("quote_count", 0))
+            + m.get("reply_count", 0))
+
+
+def _weighted(item, weight):
+    return dict(item, sample_weight=weight) if isinstance(item, dict) else item
+
+
+class LoadShedder:
+    """
+    Decides when the inference stage is overloaded and, while it is, picks
+    which queued tweets get scored.
+
+    Overloaded means the backlog is over `max_backlog` items, or the expected
+    wait for the last queued item (backlog x recent seconds per item) is over
+    `latency_slo` seconds. That switches on `degraded` (the cheap tier: no
+    summaries, no topic refits). Only if the backlog is still overloaded at
+    the degraded tier's measured cost does `should_sample` ask for sampling,
+    sized by `capacity` to what fits in the SLO. Degraded mode is held for at
+    least `min_hold` seconds and ends once the backlog and wait have stayed
+    below half their thresholds for `exit_batches` batches in a row.
+
+    `sample(items, capacity)` keeps the `priority_share` of capacity with the
+    highest engagement and fills the rest with a uniform reservoir sample of
+    everything else. Reservoir tweets get `sample_weight` = (number they
+    stand for) / (number kept), priority tweets 1, so weighted aggregates
+    over the kept tweets are unbiased estimates of the full stream.
+    """
+
+    def __init__(self, max_backlog=300, latency_slo=10.0, priority_share=0.5, on_change=None, seed=None,
+                 min_hold=30.0, exit_batches=3):
+        self.max_backlog = max_backlog
+        self.latency_slo = latency_slo
+        self.priority_share = priority_share
+        self.min_hold = min_hold
+        self.exit_batches = exit_batches
+        self.on_change = on_change              # called with the new `degraded` value
+        self.degraded = False
+        self.degraded_since = None
+        self._calm_batches = 0                  # consecutive updates below the exit thresholds
+        self.item_seconds = None                # EWMA of inference seconds per tweet
+        self.seen = 0
+        self.kept = 0
+        self.shed = 0
+        self.sampling_rate = 1.0                # kept / seen for the latest sampled backlog
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # ---------------- Overload detection ---------------- #
+    def record(self, items, seconds):
+        """Feed the duration of an inference batch."""
+        if items:
+            per_item = seconds / items
+            with self._lock:
+                self.item_seconds = per_item if self.item_seconds is None else \
+                    0.8 * self.item_seconds + 0.2 * per_item
+
+    def expected_wait(self, backlog):
+        return backlog * (self.item_seconds or 0.0)
+
+    def overloaded(self, backlog):
+        return backlog > self.max_backlog or self.expected_wait(backlog) > self.latency_slo
+
+    def update(self, backlog, now=None):
+        """Re-evaluate overload for the current backlog, once per batch. Returns `degraded`."""
+        now = time.time() if now is None else now
+        wait = self.expected_wait(backlog)
+        if self.degraded:
+            calm = backlog < self.max_backlog / 2 and wait < self.latency_slo / 2
+            self._calm_batches = self._calm_batches + 1 if calm else 0
+            changed = self._calm_batches >= self.exit_batches and now - self.degraded_since >= self.min_hold
+        else:
+            changed = self.overloaded(backlog)
+        if changed:
+            self.degraded = not self.degraded
+            self.degraded_since = now if self.degraded else None
+            self._calm_batches = 0
+            with self._lock:
+                # the other tier has a different cost per tweet; measure it afresh
+                self.item_seconds = None
+            if not self.degraded:
+                self.sampling_rate = 1.0
+            logger.warning("%s degraded mode: backlog %d, expected wait %.1fs (SLO %.1fs)",
+                           "Entering" if self.degraded else "Leaving", backlog, wait, self.latency_slo)
+            if self.on_change:
+                self.on_change(self.degraded)
+        return self.degraded
+
+    def should_sample(self, backlog):
+        """True if, even at the degraded tier's measured cost, the backlog is still overloaded."""
+        return self.degraded and self.item_seconds is not None and self.overloaded(backlog)
+
+    def capacity(self):
+        """Tweets that can be scored within the latency SLO at the current cost per tweet."""
+        return max(1, int(self.latency_slo / self.item_seconds)) if self.item_seconds else 1
+
+    # ---------------- Sampling ---------------- #
+    def sample(self, items, capacity):
+        """Pick at most `capacity` items from the iterable `items` in one pass. Returns (kept, dropped count)."""
+        priority_slots = int(capacity * self.priority_share)
+        top = []            # min-heap of (engagement, seq, item)
+        reservoir = []
+        offered = 0         # items that went through the reservoir
+        seen = 0
+
+        def offer(item):
+            nonlocal offered
+            offered += 1
+            if len(reservoir) < capacity:
+                reservoir.append(item)
+            else:
+                j = self._rng.randrange(offered)
+                if j < capacity:
+                    reservoir[j] = item
+
+        for seq, item in enumerate(items):
+            seen += 1
+            score = engagement(item)
+            if priority_slots and score > 0:
+                if len(top) < priority_slots:
+                    heappush(top, (score, seq, item))
+                    continue
+                if score > top[0][0]:
+                    item = heappushpop(top, (score, seq, item))[2]
+            offer(item)
+
+        # slots the priority tier didn't fill go to the reservoir; a uniform
+        # subsample of a uniform sample is still uniform
+        room = capacity - len(top)
+        if len(reservoir) > room:
+            reservoir = self._rng.sample(reservoir, room)
+
+        weight = offered / len(reservoir) if reservoir else 1.0
+        kept = [_weighted(item, 1.0) for _, _, item in top]
+        kept += [_weighted(item, weight) for item in reservoir]
+
+        with self._lock:
+            self.seen += seen
+            self.kept += len(kept)
+            self.shed += seen - len(kept)
+            self.sampling_rate = len(kept) / seen if seen else 1.0
+        return kept, seen - len(kept)
+
+    def stats(self):
+        return {
+            "degraded": self.degraded,
+            "degraded_since": self.degraded_since,
+            "sampling_rate": round(self.sampling_rate, 4),
+            "item_ms": round(self.item_seconds * 1000, 2) if self.item_seconds else None,
+            "max_backlog": self.max_backlog,
+            "latency_slo": self.latency_slo,
+            "seen": self.seen,
+            "kept": self.kept,
+            "shed": self.shed
+        }
@@ -1,18 +1,39 @@
 # app.py
+import atexit
+import multiprocessing
 import os
+import logging
 import threading
 import time
-import json
-from datetime import datetime
-from flask import Flask, render_template, jsonify, request
+from datetime import datetime, timezone
+import numpy as np
+from flask import Flask, Response, render_template, jsonify, request
+from flask_socketio import SocketIO, emit
 from dotenv import load_dotenv
-import pandas as pd
 
 from x_client import XClient
 from nlp_pipeline import NLPPipeline
+from aggregator import WindowAggregator
+from dedup import ExpiringIdSet
+from stages import StagedPipeline
+from push import UpdateChannel
+from event_log import EventLog
+from metrics import BatchProfiler, metrics
+from tweet_store import TweetStore
+from tweet_loader import TweetLoader
+from scored_batch import ScoredBatch
+from forecast import OVERALL, SentimentForecaster
+from load_shedder import LoadShedder
 
 load_dotenv()
 
+# LOG_LEVEL=DEBUG shows per-tweet validation details, WARNING keeps only problems
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
 # (You already had a bearer token; keep or move to .env)
 BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN", 'AAAAAAAAAAAAAAAAAAAAAN%2BU5wEAAAAAxioMe%2BP1OZVIpXeHShb3VrrAvsg%3DBGoSO3uLvsgEPHw0pX7NnAlUfhgvMdArl6Ik1Ep6rosa6qgmHk')
 if not BEARER_TOKEN:
@@ -25,101 +46,227 @@ LABEL_MAP = {
     "LABEL_1": "neutral",
     "LABEL_2": "positive"
 }
+# Sorted label keys with their dashboard names and score signs, for array lookups
+LABEL_KEYS = np.array(sorted(LABEL_MAP))
+LABEL_NAMES = np.array([LABEL_MAP[k] for k in LABEL_KEYS])
+LABEL_SIGNS = np.array([{"positive": 1.0, "negative": -1.0}.get(LABEL_MAP[k], 0.0) for k in LABEL_KEYS])
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config['SECRET_KEY'] = os.getenv("FLASK_SECRET", "secret!")
+socketio = SocketIO(app, async_mode="threading", cors_allowed_origins="*")
 
 # Global state
 DEMO_MODE = False
 streamer = None
-processed_tweets = []
+# Processed tweets are appended to a retained log that every dashboard reads
+# by offset. Set EVENT_LOG_PATH to also append them to a local JSONL file.
+event_log = EventLog(spill_path=os.getenv("EVENT_LOG_PATH"))
+updates = UpdateChannel(socketio, event_log)
+# Scored tweets are also persisted (TWEET_STORE_PATH, SQLite) for replay and history queries;
+# TWEET_STORE_PATH="" turns the store off. The newest TWEET_STORE_MAX_ROWS tweets are kept
+# (0 for no cap) and, with TWEET_STORE_MAX_AGE_DAYS, only tweets newer than that.
+TWEET_STORE_PATH = os.getenv("TWEET_STORE_PATH", "tweets.db")
+store = TweetStore(
+    TWEET_STORE_PATH,
+    max_rows=int(os.getenv("TWEET_STORE_MAX_ROWS", 1_000_000)) or None,
+    max_age=float(os.getenv("TWEET_STORE_MAX_AGE_DAYS", 0)) * 86400 or None
+) if TWEET_STORE_PATH else None
 topics_data = {}
 aggregate_data = {"count": 0, "avg_sentiment": 0.0}
 
-# NLP pipeline (device=0 if GPU avail, -1 for CPU)
-nlp = NLPPipeline(device=-1)
-
-import json
-import random
-import threading
-import time
-from datetime import datetime
-import pandas as pd
-from flask_socketio import SocketIO
+# NLP pipeline (device=0 if GPU avail, -1 for CPU). Models load on first use,
+# or up front in a background warm-up thread when the app is started directly.
+# Set EMBEDDING_CACHE_PATH to keep the embedding cache on disk between runs,
+# SENTIMENT_NEAR_DUPLICATES=1 to also reuse sentiment for near-identical tweets, and
+# SUMMARY_BUDGET (seconds) to fall back to cheaper summaries for SUMMARY_COOLDOWN
+# seconds when BART is too slow.
+# NLP_BACKEND selects CPU inference for sentiment/embeddings: torch, quantized or onnx.
+# NLP_WORKERS > 0 shards sentiment/embedding batches across that many processes,
+# each using NLP_THREADS_PER_WORKER torch threads.
+# Spawned inference workers re-import this module; they load only worker_pool's
+# models, so the pipeline is built (and its pool shut down at exit) in the parent only.
+if multiprocessing.parent_process() is None:
+    nlp = NLPPipeline(
+        device=-1,
+        backend=os.getenv("NLP_BACKEND", "torch"),
+        workers=int(os.getenv("NLP_WORKERS", 0)),
+        threads_per_worker=int(os.getenv("NLP_THREADS_PER_WORKER", 1)),
+        embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH"),
+        sentiment_near_duplicates=os.getenv("SENTIMENT_NEAR_DUPLICATES", "0") == "1",
+        summary_budget=float(os.getenv("SUMMARY_BUDGET", 0)) or None,
+        summary_cooldown=float(os.getenv("SUMMARY_COOLDOWN", 60)),
+        light_summarizer=os.getenv("LIGHT_SUMMARIZER", "extractive")
+    )
+    atexit.register(nlp.close)
+else:
+    nlp = None
+
+# PROFILE_EVERY=N runs cProfile on every Nth batch and logs the hottest
+# functions; PROFILE_DIR also keeps the raw .prof files.
+profiler = BatchProfiler(every=int(os.getenv("PROFILE_EVERY", 0)), out_dir=os.getenv("PROFILE_DIR"))
+
+# Per-topic sentiment forecasts over FORECAST_BUCKET-second buckets; Prophet (if installed)
+# is refitted in the background every PROPHET_REFIT_INTERVAL seconds.
+FORECAST_BUCKET = int(os.getenv("FORECAST_BUCKET", 300))
+PROPHET_REFIT_INTERVAL = int(os.getenv("PROPHET_REFIT_INTERVAL", 1800))
+
+# Load shedding for live/demo streams: past SHED_MAX_BACKLOG queued tweets, or an expected
+# wait over SHED_LATENCY_SLO seconds, summaries and topic refits are skipped first; only if
+# that still can't keep up is a sample of the backlog scored (the most engaging
+# SHED_PRIORITY_SHARE plus a weighted random sample of the rest, as many as fit in the SLO).
+# Degraded mode lasts at least SHED_MIN_HOLD seconds and until SHED_EXIT_BATCHES calm batches.
+LOAD_SHEDDING = os.getenv("LOAD_SHEDDING", "1") != "0"
+SHED_MAX_BACKLOG = int(os.getenv("SHED_MAX_BACKLOG", 300))
+SHED_LATENCY_SLO = float(os.getenv("SHED_LATENCY_SLO", 10))
+SHED_PRIORITY_SHARE = float(os.getenv("SHED_PRIORITY_SHARE", 0.5))
+SHED_MIN_HOLD = float(os.getenv("SHED_MIN_HOLD", 30))
+SHED_EXIT_BATCHES = int(os.getenv("SHED_EXIT_BATCHES", 3))
+
+metrics.register("sentiment_cache_hits_total", lambda: nlp.sentiment_cache.exact_hits + nlp.sentiment_cache.near_hits,
+                 kind="counter", help="Sentiment results served from the memo (exact or near-duplicate)")
+metrics.register("sentiment_cache_misses_total", lambda: nlp.sentiment_cache.misses, kind="counter")
+# metric sources must not load models: the embedding cache is None until the topic models are loaded
+metrics.register("embedding_cache_hits_total",
+                 lambda: nlp.loaded_embedding_cache().hits if nlp.loaded_embedding_cache() else None,
+                 kind="counter")
+metrics.register("embedding_cache_misses_total",
+                 lambda: nlp.loaded_embedding_cache().misses if nlp.loaded_embedding_cache() else None,
+                 kind="counter")
+metrics.register("x_api_rate_limited_total",
+                 lambda: streamer.client.rate_limited if streamer and streamer.client else None,
+                 kind="counter", help="HTTP 429 responses from the X API (per streamer)")
+metrics.register("queue_depth", lambda: {name: q["depth"] for name, q in streamer.pipeline_stats()["queues"].items()}
+                 if streamer and streamer.pipeline else None, help="Items waiting between pipeline stages")
+metrics.register("tweets_shed_total", lambda: streamer.shedder.shed if streamer else None, kind="counter",
+                 help="Queued tweets dropped by load shedding")
+metrics.register("degraded", lambda: int(streamer.shedder.degraded) if streamer else None,
+                 help="1 while load shedding is active")
+metrics.register("event_log_entries", lambda: event_log.stats()["retained"])
+metrics.register("models_ready", lambda: int(nlp.ready))
 
 # assume NLPPipeline is imported as nlp
 
+class Checkpoint:
+    """Backfill loader position, queued behind the tweets read before it."""
+
+    def __init__(self, position):
+        self.position = position
+
+
 class Streamer(threading.Thread):
-    def __init__(self, bearer_token=None, query=None, poll_interval=20, demo_mode=True, demo_file="synthetic_financial_tweets.json", replay_delay=2):
+    def __init__(self, bearer_token=None, query=None, poll_interval=20, demo_mode=True, demo_file="synthetic_financial_tweets.json", replay_delay=2, queries=None, replay=False, replay_since=None, backfill_file=None, backfill_start=None):
         super().__init__()
         self.demo_mode = demo_mode
         self.demo_file = demo_file
         self.replay_delay = replay_delay  # seconds between emitting demo tweets
         self.running = False
         self.buffer = []
-        self.agg = pd.DataFrame(columns=["ts", "sentiment_score"])
-        self.seen_ids = set()
+        self.agg = WindowAggregator()
+        self.forecaster = SentimentForecaster(bucket_seconds=FORECAST_BUCKET, prophet_interval=PROPHET_REFIT_INTERVAL)
+        self.shedder = LoadShedder(SHED_MAX_BACKLOG, SHED_LATENCY_SLO, SHED_PRIORITY_SHARE,
+                                   on_change=self._set_degraded, min_hold=SHED_MIN_HOLD,
+                                   exit_batches=SHED_EXIT_BATCHES)
+        self.seen_ids = ExpiringIdSet()
         self.poll_interval = poll_interval
         self.query = query or DEFAULT_QUERY
+        self.queries = queries or []  # extra saved queries (e.g. per ticker or sector) polled concurrently
+        self.client = None
+        self.pipeline = None
+        self.replay = replay  # stream stored results from the tweet store instead of running inference
+        self.replay_since = replay_since
+        self._replay = None
+        self._replay_shift = None
+        # backfill: push an archive (JSONL/JSON, optionally gzip/zstd) through the models as fast as they go
+        self.backfill_file = backfill_file
+        self.backfill_start = backfill_start
+        self.backfill = None
+        self.backfill_committed = None   # loader position up to which every tweet has been published
+        self.source_done = False
+        self._batches = None
         
         # Initialize client based on mode
         self._init_client(bearer_token)
     
     def _init_client(self, bearer_token):
-        if self.demo_mode:
-            try:
-                # Load demo tweets
-                with open(self.demo_file, "r", encoding="utf-8") as f:
-                    self.demo_tweets = json.load(f)
-                    # Handle both formats - with 'data' key and direct array
-                    self.demo_tweets = self.demo_tweets.get("data", self.demo_tweets)
-                    if not isinstance(self.demo_tweets, list):
-                        self.demo_tweets = [self.demo_tweets]
-                self.demo_index = 0
-                print(f"Loaded {len(self.demo_tweets)} demo tweets")
-            except Exception as e:
-                print(f"Error loading demo tweets: {e}")
-                self.demo_tweets = []
+        if self.replay:
+            logger.info("Replaying stored tweets from %s", store.path)
+        elif self.backfill_file:
+            # start is {"byte": n} and/or {"record": n}, e.g. a position from /status
+            self.backfill = TweetLoader(self.backfill_file, start=self.backfill_start)
+            self.backfill_committed = self.backfill.position
+            logger.info("Backfilling from %s at %s", self.backfill_file, self.backfill.position)
+        elif self.demo_mode:
+            # Demo tweets are read lazily, 50 at a time (JSON array, {"data": [...]} or JSONL)
+            if not os.path.exists(self.demo_file):
+                logger.error("Demo file %s not found", self.demo_file)
+                self.demo_file = None
         else:
             try:
                 from x_client import XClient
-                self.client = XClient(bearer_token, self.query, max_results=10)
-                print("Initialized XClient with query:", self.query)
+                self.client = XClient(bearer_token, self.query, max_results=10, queries=self.queries)
+                logger.info("Initialized XClient with queries: %s", [self.query] + self.queries)
             except Exception as e:
-                print(f"Error initializing XClient: {e}")
+                logger.error("Error initializing XClient: %s", e)
                 self.client = None
 
-    def score_sentiment(self, sentiment_result):
-        label = sentiment_result.get('label', '').upper()
-        label = LABEL_MAP[label]
-        score = sentiment_result.get('score', 0)
-
-        if label == "positive":
-            return score
-        elif label == "negative":
-            return -score
-        else:
-            return 0
+    def assemble(self, tweets, sent_results, topics):
+        """
+        Turn one batch of model outputs into a ScoredBatch and feed the
+        aggregator, column-wise: timestamps are parsed in one call and labels
+        become signed scores through array lookups. Tweets with an unknown
+        label or an unparseable created_at are dropped.
+        """
+        import pandas as pd
+
+        n = len(tweets)
+        labels = np.array([s.get("label", "").upper() for s in sent_results[:n]])
+        idx = np.searchsorted(LABEL_KEYS, labels)
+        known = LABEL_KEYS[np.minimum(idx, len(LABEL_KEYS) - 1)] == labels
+        raw = np.fromiter((s.get("score", 0) for s in sent_results[:n]), dtype=np.float64, count=len(labels))
+
+        created = [t["created_at"] for t in tweets[:len(labels)]]
+        parsed = pd.to_datetime(pd.Series(created, dtype=object), utc=True, errors="coerce", format="mixed")
+        ts = ((parsed - EPOCH) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+
+        topic_col = np.array([str(t) for t in topics[:len(labels)]] + ["0"] * (len(labels) - len(topics)))
+        keep = known & ~np.isnan(ts)
+        if not keep.all():
+            logger.warning("Dropping %d tweets with an unknown label or timestamp", int((~keep).sum()))
+        rows = np.flatnonzero(keep)
+        idx, ts, topic_col = idx[rows], ts[rows], topic_col[rows]
+        scores = LABEL_SIGNS[idx] * raw[rows]
+        # tweets sampled by the load shedder stand for sample_weight tweets each
+        weights = np.fromiter((tweets[i].get("sample_weight", 1.0) for i in rows), dtype=np.float64, count=len(rows))
+
+        self.agg.add_many(ts, scores, topic_col, weights=weights)
+        self.forecaster.observe(ts, scores, topic_col, weights)
+        return ScoredBatch(
+            id=[tweets[i]["id"] for i in rows],
+            text=[tweets[i]["text"] for i in rows],
+            created_at=[created[i] for i in rows],
+            ts=ts,
+            sentiment_label=LABEL_NAMES[idx].tolist(),
+            sentiment_score=scores,
+            topic=topic_col.tolist(),
+            weight=weights
+        )
 
     def process_batch(self, tweets):
-        print(f"\n=== Processing batch of {len(tweets)} tweets ===")
+        logger.info("Processing batch of %d tweets", len(tweets))
+        metrics.inc("batches_total")
+        metrics.inc("tweets_total", len(tweets))
         texts = []
         valid_tweets = []
 
-        for i, t in enumerate(tweets):
-            try:
-                # Ensure tweet is a dictionary
+        with metrics.time("validation"):
+            for i, t in enumerate(tweets):
+                # Ensure tweet is a dictionary with non-empty text
                 if not isinstance(t, dict):
-                    print(f"[DEBUG] Tweet {i}: Not a dictionary, got {type(t)}")
-                    continue
-
-                # Ensure required fields exist
-                if 'text' not in t:
-                    print(f"[DEBUG] Tweet {i}: Missing 'text' field. Available keys: {list(t.keys())}")
+                    logger.debug("Tweet %d: not a dictionary, got %s", i, type(t))
                     continue
-
-                text = t.get('text', '').strip()
-                if not text:
-                    print(f"[DEBUG] Tweet {i}: Empty text")
+                text = t.get('text')
+                if not isinstance(text, str) or not text.strip():
+                    logger.debug("Tweet %d: missing or empty 'text'", i)
                     continue
 
                 # Add required fields if missing
@@ -128,168 +275,227 @@ class Streamer(threading.Thread):
                 if 'created_at' not in t:
                     t['created_at'] = datetime.utcnow().isoformat()
 
-                texts.append(text)
+                texts.append(text.strip())
                 valid_tweets.append(t)
 
-                # Debug print for first few tweets
-                if i < 3:
-                    print(f"[DEBUG] Sample tweet {i}:")
-                    print(f"  ID: {t.get('id', 'N/A')}")
-                    print(f"  Text: {text[:100]}{'...' if len(text) > 100 else ''}")
-                    print(f"  Created at: {t.get('created_at', 'N/A')}")
-                    print("  ---")
-
-            except Exception as e:
-                print(f"[ERROR] Error processing tweet {i}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                continue
-
+        metrics.inc("tweets_invalid_total", len(tweets) - len(texts))
         if not texts:
-            print("No valid texts to process in this batch")
-            return [], {}
+            logger.info("No valid texts to process in this batch")
+            return ScoredBatch([], [], [], [], [], [], []), {}
 
         try:
-            # Sentiment analysis
-            print(f"Running sentiment analysis on {len(texts)} texts")
-            sent_results = nlp.analyze_sentiment(texts)
+            with metrics.time("sentiment"):
+                sent_results = nlp.analyze_sentiment(texts)
+            logger.debug("Sentiment cache: %s", nlp.last_sentiment_stats)
 
             # Topic modeling if we have enough texts
             if len(texts) > 1:
-                print("Running topic modeling...")
-                topics, _ = nlp.fit_topics(texts)
-                topic_info = nlp.get_topic_info(texts, topics)
+                with metrics.time("topic_fit"):
+                    topics, _ = nlp.fit_topics(texts)
+                with metrics.time("summarization"):
+                    topic_info = nlp.get_topic_info(texts, topics)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Embedding cache: %s", nlp.embedding_cache.stats() if nlp.embedding_cache else None)
+                    logger.debug("Padding efficiency: %s", nlp.padding_stats())
             else:
                 topics = [0]
                 topic_info = {0: {"count": 1, "sample": texts}}
 
-            # Prepare processed tweets
-            processed = []
-            for i, (tweet, sent) in enumerate(zip(valid_tweets, sent_results)):
-                try:
-                    score = self.score_sentiment(sent)
-                    label = LABEL_MAP[sent.get("label", "neutral")]
-                    processed.append({
-                        "id": tweet.get("id", f"tweet-{i}"),
-                        "text": tweet["text"],
-                        "created_at": tweet.get("created_at", datetime.utcnow().isoformat()),
-                        "sentiment_label": label,
-                        "sentiment_score": score,
-                        "topic": str(topics[i]) if i < len(topics) else "0"
-                    })
-                    ts = pd.to_datetime(tweet.get("created_at"))
-                    if ts.tzinfo is None:
-                        ts = ts.tz_localize('UTC')
-                    else:
-                        ts = ts.tz_convert('UTC')
-                    self.agg = pd.concat([self.agg, pd.DataFrame([{"ts": ts, "sentiment_score": score}])],
-                                         ignore_index=True)
-                except Exception as e:
-                    print(f"Error preparing tweet {i}: {str(e)}")
-                    continue
+            with metrics.time("aggregation"):
+                processed = self.assemble(valid_tweets, sent_results, topics)
 
+            metrics.inc("tweets_processed_total", len(processed))
             return processed, topic_info
 
-        except Exception as e:
-            print(f"Error in batch processing: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return [], {}
+        except Exception:
+            metrics.inc("batch_errors_total")
+            logger.exception("Error in batch processing")
+            return ScoredBatch([], [], [], [], [], [], []), {}
+
+    # ---------------- Pipeline stages ---------------- #
+    def _fetch_demo(self):
+        """Next slice of up to 50 demo tweets, wrapping around at the end."""
+        if not self.demo_file:
+            return []
+        if self._batches is None:
+            self._batches = TweetLoader(self.demo_file).batches(50)
+        batch = next(self._batches, None)
+        if batch is None:
+            logger.info("Reached end of demo tweets, restarting from beginning")
+            self._batches = None
+            return []
+        logger.debug("Queued batch of %d demo tweets", len(batch))
+        return batch
+
+    def _fetch_backfill(self):
+        """Next 500 archived tweets; the bounded queues, not a timer, set the pace."""
+        if self._batches is None:
+            self._batches = self.backfill.batches(500)
+        batch = next(self._batches, None)
+        if batch is None:
+            self.source_done = True
+            return []
+        metrics.inc("tweets_backfilled_total", len(batch))
+        # the read position after this batch follows it through the queue until it is published
+        return batch + [Checkpoint(self.backfill.position)]
+
+    def process_backfill(self, items):
+        """process_batch, plus the newest loader position among the items for _publish to commit."""
+        checkpoints = [i.position for i in items if isinstance(i, Checkpoint)]
+        processed, topic_info = self.process_batch([i for i in items if not isinstance(i, Checkpoint)])
+        return processed, topic_info, checkpoints[-1] if checkpoints else None
+
+    def _fetch_live(self):
+        tweets = self.client.fetch_recent()
+        fresh = [t for t in tweets if self.seen_ids.add(t.get("id"))]
+        metrics.inc("tweets_fetched_total", len(tweets))
+        metrics.inc("dedup_dropped_total", len(tweets) - len(fresh))
+        return fresh
+
+    def _fetch_replay(self):
+        """Next page of stored, already-scored tweets, restarting from the beginning at the end."""
+        if self._replay is None:
+            self._replay = store.replay(since=self.replay_since, batch_size=50)
+        batch = next(self._replay, None)
+        if batch is None:
+            logger.info("Reached end of stored tweets, restarting from beginning")
+            self._replay = None
+            self._replay_shift = None
+            return []
+        return batch
+
+    def replay_batch(self, rows):
+        """Inference stage for replay mode: aggregate the stored scores, no models involved."""
+        # shift stored timestamps so the replay starts "now" and keeps its original spacing
+        if self._replay_shift is None:
+            self._replay_shift = time.time() - rows[0]["ts"]
+        batch = ScoredBatch.from_dicts(rows)
+        # replay reads faster than real time; tweets that would land in the future count as now
+        ts = np.minimum(batch["ts"] + self._replay_shift, time.time())
+        with metrics.time("aggregation"):
+            self.agg.add_many(ts, batch["sentiment_score"], batch["topic"], weights=batch["weight"])
+            self.forecaster.observe(ts, batch["sentiment_score"], batch["topic"], batch["weight"])
+        metrics.inc("tweets_replayed_total", len(batch))
+        return batch, store.topic_summaries(set(batch["topic"]))
+
+    def _publish(self, result):
+        """Store the processed tweets and data for the dashboard."""
+        global topics_data
+        global aggregate_data
+
+        processed, topic_info, *checkpoint = result   # backfill results also carry a loader position
+        logger.info("Successfully processed %d tweets", len(processed))
+        if store and not self.replay:
+            with metrics.time("storage"):
+                store.write(processed, topic_info)
+        with metrics.time("serialization"):
+            logged = event_log.append_many(processed.to_dicts())
+            if topic_info:
+                topics_data = topic_info
+            aggregate_data = self.get_aggregate_snapshot()
+            updates.publish(logged, topics_data, aggregate_data)
+        if checkpoint and checkpoint[0] is not None:
+            self.backfill_committed = checkpoint[0]
 
     def run(self):
         self.running = True
-        if self.demo_mode:
-            print("Starting in DEMO MODE")
-            # No socket emit needed for polling
-
-            while self.running and self.demo_mode:
-                try:
-                    # Process tweets in smaller batches
-                    batch_size = min(50, len(self.demo_tweets) - self.demo_index)
-                    if batch_size <= 0:
-                        print("Reached end of demo tweets, restarting from beginning")
-                        self.demo_index = 0
-                        time.sleep(2)  # Small delay before restarting
-                        continue
-
-                    batch = self.demo_tweets[self.demo_index:self.demo_index + batch_size]
-                    print(
-                        f"\nProcessing batch of {len(batch)} demo tweets (index {self.demo_index}-{self.demo_index + batch_size})")
-
-                    # Process the batch
-                    processed, topic_info = self.process_batch(batch)
-                    print(f"Successfully processed {len(processed)} tweets")
-
-                    # Store the processed tweets and data
-                    global processed_tweets
-                    global topics_data
-                    global aggregate_data
-                    
-                    processed_tweets = processed
-                    if topic_info:
-                        topics_data = topic_info
-                    aggregate_data = self.get_aggregate_snapshot()
-                    
-                    # Add a small delay between batches
-                    time.sleep(3)
-
-                    self.demo_index += batch_size
-                    time.sleep(3)  # Wait before next batch
-
-                except Exception as e:
-                    print(f"Error in demo mode loop: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-                    time.sleep(5)  # Wait before retrying
-
+        if self.replay:
+            logger.info("Starting in REPLAY MODE")
+            fetch, process = self._fetch_replay, self.replay_batch
+        elif self.backfill:
+            logger.info("Starting BACKFILL from %s", self.backfill_file)
+            fetch, process = self._fetch_backfill, profiler.wrap(self.process_backfill)
+        elif self.demo_mode:
+            logger.info("Starting in DEMO MODE")
+            fetch, process = self._fetch_demo, profiler.wrap(self.process_batch)
         else:
-            # Existing non-demo mode code
-            while self.running:
-                try:
-                    tweets = self.client.fetch_recent()
-                    new_tweets = [t for t in tweets if t.get("id") not in self.seen_ids]
-                    for t in new_tweets:
-                        self.seen_ids.add(t.get("id"))
-                    if new_tweets:
-                        processed, topic_info = self.process_batch(new_tweets)
-                        for p in processed:
-                            # No socket emit needed for polling
-                            pass
-                        # No socket emit needed for polling
-                        pass
-                    time.sleep(self.poll_interval)
-                except Exception as e:
-                    print(f"Error in main loop: {str(e)}")
-                    time.sleep(5)
+            fetch, process = self._fetch_live, profiler.wrap(self.process_batch)
+        # backfill and replay keep every tweet; only real-time streams shed load
+        shed = LOAD_SHEDDING and not (self.backfill or self.replay)
+        self.pipeline = StagedPipeline(
+            fetch=fetch,
+            process=process,
+            publish=self._publish,
+            fetch_interval=0 if self.backfill else self.poll_interval,
+            shedder=self.shedder if shed else None
+        )
+        self.pipeline.start()
+        while self.running:
+            if self.source_done and self.pipeline.idle:
+                logger.info("Backfill complete: %s (%d malformed records skipped)",
+                            self.backfill_committed, self.backfill.errors)
+                self.running = False
+                break
+            time.sleep(0.5)
+        self.pipeline.stop()
+        self.pipeline.join()
+        nlp.degraded = False
+        if store:
+            store.flush()
 
     def stop(self):
         """Stop the streaming thread."""
         self.running = False
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.client:
+            self.client.close()
+        nlp.degraded = False
+        nlp.flush()
+        if store:
+            store.flush()
         if hasattr(self, 'demo_mode') and self.demo_mode:
             # No socket emit needed for polling
-            print("Streamer stopped")
+            logger.info("Streamer stopped")
+
+    def _set_degraded(self, degraded):
+        """Drop summarization and topic-model work while shedding load."""
+        nlp.degraded = degraded
+        metrics.inc("degraded_transitions_total")
+
+    def pipeline_stats(self):
+        return self.pipeline.snapshot() if self.pipeline else {}
+
+    def backfill_status(self):
+        """
+        Progress of a backfill run. `position` only moves past tweets that
+        have been published, so it is safe to resume from via backfill_start;
+        `read` is how far the loader has got, including tweets still queued.
+        """
+        if not self.backfill:
+            return None
+        return {"file": self.backfill_file, "position": self.backfill_committed,
+                "read": self.backfill.position, "errors": self.backfill.errors, "done": self.source_done}
 
     def get_aggregate_snapshot(self, window_minutes=15):
+        snapshot = self._window_snapshot(window_minutes)
+        snapshot["degraded"] = self.shedder.degraded
+        snapshot["sampling_rate"] = round(self.shedder.sampling_rate, 4)
+        return snapshot
+
+    def _window_snapshot(self, window_minutes):
         if self.agg.empty:
             return {"count": 0, "avg_sentiment": 1.0}
 
-        # ensure 'ts' is timezone-aware UTC
-        if self.agg['ts'].dt.tz is None:
-            self.agg['ts'] = self.agg['ts'].dt.tz_localize('UTC')
-
-        now = pd.Timestamp.now(tz='UTC')
-        cutoff = now - pd.Timedelta(minutes=window_minutes)
+        windows = self.agg.snapshot()
+        name = self.agg.window_for(window_minutes * 60)
+        recent = windows.get(name) if name else None
 
-        recent = self.agg[self.agg['ts'] >= cutoff]
+        if not recent or recent["count"] == 0:
+            return {"count": 500, "avg_sentiment": 0.1912, "windows": windows}
 
-        if recent.empty:
-            return {"count": 500, "avg_sentiment": 0.1912}
+        snapshot = {"count": recent["count"], "avg_sentiment": recent["mean"], "windows": windows}
+        overall = self.forecaster.forecast(OVERALL)["topics"].get(OVERALL)
+        if overall:
+            snapshot["forecast"] = dict(overall["points"][0], model=overall["model"])
+        return snapshot
 
-        return {"count": int(len(recent)), "avg_sentiment": float(recent['sentiment_score'].mean())}
 
-
-# initial streamer (not started automatically)
-streamer = Streamer(BEARER_TOKEN, DEFAULT_QUERY, poll_interval=20, demo_mode=True)
+def start_warm_up():
+    """Load the NLP models in the background so the first batch doesn't wait for them."""
+    worker = threading.Thread(target=nlp.warm_up, name="nlp-warm-up", daemon=True)
+    worker.start()
+    return worker
 
 @app.route("/")
 def index():
@@ -303,10 +509,19 @@ def set_demo_mode():
 
 @app.route("/api/start", methods=["POST"])
 def start():
-    global streamer, DEMO_MODE, processed_tweets, topics_data, aggregate_data
+    global streamer, DEMO_MODE, topics_data, aggregate_data
     data = request.get_json() or {}
     query = data.get("query")
+    queries = data.get("queries") or []
     demo_mode = data.get("demo_mode", DEMO_MODE)
+    # replay: stream previously scored tweets from the store, optionally only the last `replay_hours`
+    replay = bool(data.get("replay", False))
+    replay_hours = data.get("replay_hours")
+    # backfill: run an archive file through the models, resuming from backfill_start if given
+    backfill_file = data.get("backfill_file")
+    backfill_start = data.get("backfill_start")
+    if replay and store is None:
+        return jsonify({"status": "error", "message": "replay needs the tweet store (TWEET_STORE_PATH is empty)"}), 400
     
     # Update global demo mode if changed
     if demo_mode != DEMO_MODE:
@@ -318,16 +533,22 @@ def start():
         streamer.join()
     
     # Clear previous data
-    processed_tweets = []
+    event_log.clear()
     topics_data = {}
     aggregate_data = {"count": 0, "avg_sentiment": 0.0}
+    updates.reset()
     
     # Start new streamer with current settings
     streamer = Streamer(
         BEARER_TOKEN, 
         query, 
         poll_interval=2 if DEMO_MODE else 20,  # Faster updates in demo mode
-        demo_mode=DEMO_MODE
+        demo_mode=DEMO_MODE,
+        queries=queries,
+        replay=replay,
+        replay_since=time.time() - float(replay_hours) * 3600 if replay_hours else None,
+        backfill_file=backfill_file,
+        backfill_start=backfill_start
     )
     streamer.daemon = True
     streamer.start()
@@ -335,67 +556,136 @@ def start():
     return jsonify({
         "status": "started", 
         "demo_mode": DEMO_MODE,
-        "query": query or DEFAULT_QUERY
+        "query": query or DEFAULT_QUERY,
+        "queries": queries,
+        "replay": replay,
+        "backfill": streamer.backfill_status()
     }), 200
 
 @app.route("/api/stop", methods=["POST"])
 def stop():
-    global streamer, processed_tweets, topics_data, aggregate_data
+    global streamer, topics_data, aggregate_data
     if streamer and streamer.is_alive():
         streamer.stop()
         streamer.join()
     # Clear the data when stopping
-    processed_tweets = []
+    event_log.clear()
     topics_data = {}
     aggregate_data = {"count": 0, "avg_sentiment": 0.0}
+    updates.reset()
     return jsonify({"status": "stopped"}), 200
 
 @app.route("/api/updates", methods=["POST"])
 def get_updates():
-    global processed_tweets, topics_data, aggregate_data
-    
+    """
+    Tweets after `last_offset` (or after a named `consumer`'s cursor), plus the
+    current topics and aggregate. Reading does not consume the log.
+    """
     try:
         data = request.get_json() or {}
-        last_tweet_id = data.get('last_tweet_id')
-        
-        # Get new tweets since last_tweet_id
-        if last_tweet_id:
-            try:
-                # Find the index of the last seen tweet
-                last_index = next((i for i, t in enumerate(processed_tweets) 
-                                 if t.get('id') == last_tweet_id), -1)
-                new_tweets = processed_tweets[:last_index] if last_index > 0 else processed_tweets
-            except Exception as e:
-                print(f"Error finding last tweet: {e}")
-                new_tweets = processed_tweets
+        consumer = data.get('consumer')
+        last_offset = data.get('last_offset')
+        limit = min(int(data.get('limit', 500)), 5000)
+
+        log_end = event_log.last_offset
+        if consumer:
+            new_tweets = event_log.poll(consumer, limit)
         else:
-            new_tweets = processed_tweets
-        
-        # Clear processed tweets after sending them
-        processed_tweets = []
-        
-        # Get the ID of the last tweet if available
-        last_id = new_tweets[-1]['id'] if new_tweets else last_tweet_id
-        
+            if last_offset is None:
+                # new client: start from the most recent tweets only
+                last_offset = log_end - limit
+            new_tweets = event_log.read_after(last_offset, limit)
+
+        last_offset = new_tweets[-1]['offset'] if new_tweets else log_end
+        last_id = new_tweets[-1]['id'] if new_tweets else data.get('last_tweet_id')
+
         return jsonify({
             'status': 'success',
             'tweets': new_tweets,
             'topics': topics_data,
             'aggregate': aggregate_data,
+            'last_offset': last_offset,
             'last_tweet_id': last_id
         })
         
     except Exception as e:
-        print(f"Error in /api/updates: {str(e)}")
+        logger.exception("Error in /api/updates")
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+@app.route("/api/forecast")
+def forecast():
+    """
+    Cached short-horizon sentiment forecasts per topic ("__all__" is every
+    topic combined). Nothing is fitted here; the cache is rebuilt as buckets close.
+    """
+    if not streamer:
+        return jsonify({"status": "success", "forecast": None})
+    return jsonify({
+        "status": "success",
+        "forecast": streamer.forecaster.forecast(request.args.get("topic")),
+        "stats": streamer.forecaster.stats()
+    })
+
+@app.route("/api/history")
+def history():
+    """
+    Stored sentiment per topic per bucket, e.g.
+    /api/history?hours=168&bucket=3600&topic=Earnings for hourly sentiment over the last 7 days.
+    """
+    if store is None:
+        return jsonify({"status": "error", "message": "tweet store disabled (TWEET_STORE_PATH is empty)"}), 404
+    try:
+        hours = min(float(request.args.get("hours", 168)), 24 * 365)
+        bucket = max(int(request.args.get("bucket", 3600)), 60)
+        rows = store.sentiment_by_topic(hours=hours, bucket_seconds=bucket, topic=request.args.get("topic"))
+        return jsonify({"status": "success", "hours": hours, "bucket": bucket, "buckets": rows})
+    except Exception as e:
+        logger.exception("Error in /api/history")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@socketio.on("resume")
+def resume(data):
+    """Send a (re)connecting dashboard only the updates it missed."""
+    data = data or {}
+    kind, payload = updates.resume(data.get("last_seq"), data.get("last_offset"))
+    if kind == "snapshot":
+        emit("snapshot", payload)
+    else:
+        for delta in payload:
+            emit("update", delta)
+
+@app.route("/ready")
+def ready():
+    """200 once every model is loaded, 503 while warming up."""
+    body = {"ready": nlp.ready, "models": nlp.loaded_models()}
+    return jsonify(body), 200 if nlp.ready else 503
+
 @app.route("/status")
 def status():
     running = streamer.running if streamer else False
-    return jsonify({"running": running, "demo_mode": DEMO_MODE}), 200
+    pipeline = streamer.pipeline_stats() if streamer else {}
+    return jsonify({
+        "running": running,
+        "demo_mode": DEMO_MODE,
+        "pipeline": pipeline,
+        "event_log": event_log.stats(),
+        "store": store.stats() if store else None,
+        "backfill": streamer.backfill_status() if streamer else None,
+        "backend": nlp.backend_report,
+        "ready": nlp.ready,
+        "metrics": metrics.snapshot()
+    }), 200
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Stage timers and counters in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=True)
+    # with the reloader on, only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" and os.getenv("NLP_WARMUP", "1") != "0":
+        start_warm_up()
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000, use_reloader=True, allow_unsafe_werkzeug=True)
@@ -0,0 +1,193 @@
+"""
+Process-wide timers and counters.
+
+    with metrics.time("sentiment"):
+        ...
+    metrics.inc("tweets_total", len(batch))
+
+`snapshot()` is what /status returns and `render()` is the Prometheus text
+exposition served at /metrics. Values owned by other objects (cache hits,
+429s seen by the X client) are registered as callables and read at scrape
+time, so nothing is double counted.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Timer:
+    """Count, sum and max of a stage's durations, plus quantiles over the most recent samples."""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        if not self.recent:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.quantile(np.fromiter(self.recent, dtype=np.float64), QUANTILES)
+        return dict(zip(QUANTILES, values.tolist()))
+
+    def as_dict(self):
+        q = self.quantiles()
+        return {
+            "count": self.count,
+            "last_ms": round(self.last * 1000, 1),
+            "avg_ms": round(self.total * 1000 / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(q[0.5] * 1000, 1),
+            "p95_ms": round(q[0.95] * 1000, 1),
+            "p99_ms": round(q[0.99] * 1000, 1),
+            "max_ms": round(self.max * 1000, 1)
+        }
+
+
+class Metrics:
+    def __init__(self, namespace="finsent"):
+        self.namespace = namespace
+        self.counters = {}
+        self.timers = {}
+        self._sources = {}   # name -> (kind, help, callable)
+        self._lock = threading.Lock()
+
+    # ---------------- Recording ---------------- #
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            timer = self.timers.get(stage)
+            if timer is None:
+                timer = self.timers[stage] = Timer()
+            timer.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def register(self, name, fn, kind="gauge", help=""):
+        """Read `fn()` at scrape time. It may return a number or a {label: number} dict."""
+        self._sources[name] = (kind, help, fn)
+
+    # ---------------- Export ---------------- #
+    def _read_sources(self):
+        out = {}
+        for name, (kind, _, fn) in self._sources.items():
+            try:
+                out[name] = fn()
+            except Exception as e:
+                logger.debug("Metric source %s failed: %s", name, e)
+        return out
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            timers = {stage: t.as_dict() for stage, t in self.timers.items()}
+        return {"counters": counters, "timers": timers, "sources": self._read_sources()}
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timers = sorted((stage, t.count, t.total, t.quantiles()) for stage, t in self.timers.items())
+
+        for name, value in counters:
+            lines.append(f"# TYPE {ns}_{name} counter")
+            lines.append(f"{ns}_{name} {value}")
+
+        if timers:
+            lines.append(f"# HELP {ns}_stage_seconds Time spent per pipeline stage")
+            lines.append(f"# TYPE {ns}_stage_seconds summary")
+            for stage, count, total, q in timers:
+                for quantile, value in q.items():
+                    lines.append(f'{ns}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+                lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+                lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        values = self._read_sources()
+        for name, (kind, help, _) in sorted(self._sources.items()):
+            if name not in values or values[name] is None:
+                continue
+            if help:
+                lines.append(f"# HELP {ns}_{name} {help}")
+            lines.append(f"# TYPE {ns}_{name} {kind}")
+            value = values[name]
+            if isinstance(value, dict):
+                for label, v in sorted(value.items()):
+                    lines.append(f'{ns}_{name}{{name="{label}"}} {v}')
+            else:
+                lines.append(f"{ns}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class BatchProfiler:
+    """
+    Opt-in cProfile around every `every`-th call (0 disables it). The top
+    functions by cumulative time are logged, and with `out_dir` set the raw
+    stats are also written there for snakeviz/pstats.
+    """
+
+    def __init__(self, every=0, out_dir=None, top=20):
+        self.every = every
+        self.out_dir = out_dir
+        self.top = top
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        if self.every <= 0:
+            return False
+        with self._lock:
+            self.calls += 1
+            return self.calls % self.every == 0
+
+    def wrap(self, fn):
+        def profiled(*args, **kwargs):
+            if not self._sample():
+                return fn(*args, **kwargs)
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(fn, *args, **kwargs)
+            finally:
+                self._report(profiler, fn.__name__)
+        return profiled
+
+    def _report(self, profiler, name):
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        logger.info("Profile of %s call %d:\n%s", name, self.calls, out.getvalue())
+        if self.out_dir:
+            os.makedirs(self.out_dir, exist_ok=True)
+            stats.dump_stats(os.path.join(self.out_dir, f"{name}-{self.calls}.prof"))
+
+
+metrics = Metrics()
@@ -1,50 +1,110 @@
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
-from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
-import nltk
-from nltk.corpus import stopwords
-nltk.download('stopwords')
+import logging
+import math
+import multiprocessing
+import re
+import threading
+import time
+from collections import Counter
+from batching import BucketedBatcher, BucketedEncoder
+from caches import EmbeddingCache, SentimentCache, normalize_text
+from inference_backend import build_embedder, build_sentiment
+from keyword_matcher import KeywordMatcher
+from topic_engine import OnlineTopicEngine
+from worker_pool import InferencePool, score
+
+logger = logging.getLogger(__name__)
+
+
+def load_stopwords():
+    """English stopwords from the local NLTK data, or scikit-learn's bundled list when it isn't installed."""
+    try:
+        from nltk.corpus import stopwords
+        return set(stopwords.words("english"))
+    except LookupError:
+        logger.warning("NLTK stopwords not found, using scikit-learn's list "
+                       "(run: python -c \"import nltk; nltk.download('stopwords')\")")
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        return set(ENGLISH_STOP_WORDS)
+
+
+TERM_RE = re.compile(r"[a-z$][a-z0-9&$']{2,}")
+
+
+def _cosine(a, b):
+    """Cosine similarity of two term-count Counters."""
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    return dot / math.sqrt(sum(c * c for c in a.values()) * sum(c * c for c in b.values()))
+
 
 class NLPPipeline:
-    def __init__(self, device=0):
-        # Sentiment pipeline
-        self.sentiment = pipeline(
-            task="sentiment-analysis",
-            model="cardiffnlp/twitter-roberta-base-sentiment",
-            truncation=True,
-            max_length=256,
-            device=device
+    """
+    Sentiment, summarization and topic models behind one interface.
+
+    Constructing the pipeline is cheap: each model group (sentiment,
+    summarizer, topics/embeddings) is loaded on first use, or all at once by
+    `warm_up()` in a background thread. `ready` reports whether everything
+    is loaded.
+    """
+
+    def __init__(self, device=0, topic_warmup=200, topic_window=2000, topic_refit_interval=600,
+                 embedding_cache_size=50000, embedding_cache_path=None,
+                 sentiment_cache_size=100000, sentiment_near_duplicates=False,
+                 summary_budget=None, light_summarizer="extractive", summary_cooldown=60,
+                 summary_reuse_threshold=0.6, summary_max_age=600,
+                 backend="torch", model_cache_dir=".model_cache",
+                 token_budget=8192, max_batch_size=64,
+                 workers=0, threads_per_worker=1):
+        self._device = device
+        self.backend = backend
+        self.model_cache_dir = model_cache_dir
+        self.backend_report = {}
+        self._load_lock = threading.RLock()
+        self._loaded = {"sentiment": False, "summarizer": False, "topics": False}
+
+        # Memo layer in front of the sentiment model
+        self.sentiment_cache = SentimentCache(
+            capacity=sentiment_cache_size,
+            near_duplicates=sentiment_near_duplicates
         )
+        self.last_sentiment_stats = {}
 
-        # Summarizer
-        try:
-            self.summarizer = pipeline(
-                "summarization",
-                model="facebook/bart-large-cnn",
-                device=device
-            )
-        except Exception:
-            self.summarizer = None
-
-        # Topic Modeling / Embeddings
-        try:
-            self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
-            self.topic_model = BERTopic(
-                embedding_model=self.embedder,
-                verbose=False
-            )
-            self.use_bertopic = True
-        except Exception:
-            print("BERTopic unavailable — falling back to LDA.")
-            self.topic_model = None
-            self.use_bertopic = False
-            self.count_vectorizer = CountVectorizer(
-                stop_words="english",
-                max_features=2000
-            )
+        # Length-bucketed batching for transformer calls; padding efficiency per stage
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+
+        # Optional process pool for sentiment/embeddings, started on first use.
+        # Never started inside a worker process (spawn re-imports the main module).
+        self.workers = workers if multiprocessing.parent_process() is None else 0
+        self.threads_per_worker = threads_per_worker
+        self._pool = None
 
-        self.stop_words = set(stopwords.words("english"))
+        # Cheaper tier used while summarization is over its latency budget (seconds):
+        # "extractive" (centroid tweet) or "distilbart" (sshleifer/distilbart-cnn-12-6)
+        self.summary_budget = summary_budget
+        self.light_summarizer = light_summarizer
+        self.summary_cooldown = summary_cooldown   # seconds on the light tier after a slow batch
+        # A topic's summary is reused while the batch's term profile stays within
+        # summary_reuse_threshold cosine similarity of the tweets it was written
+        # from, for at most summary_max_age seconds
+        self.summary_reuse_threshold = summary_reuse_threshold
+        self.summary_max_age = summary_max_age
+        self._distil_summarizer = None
+        self._light_until = 0.0
+        # set while the streamer is shedding load: no summarizer calls, no topic-model work
+        self.degraded = False
+        self._summary_memo = {}   # topic -> (term profile, summary, written at), kept across batches
+        self.summary_batch_stats = {}
+
+        # Topic engine settings, used when the topic models are loaded
+        self._topic_settings = {
+            "warmup_size": topic_warmup,
+            "window_size": topic_window,
+            "refit_interval": topic_refit_interval
+        }
+        self._embedding_cache_settings = {"capacity": embedding_cache_size, "path": embedding_cache_path}
+        self._stop_words = None
 
         # Topic map for human-readable labels
         self.topic_map = {
@@ -64,41 +124,272 @@ class NLPPipeline:
             "Housing Market": ["real estate", "housing", "mortgage", "home prices", "construction", "property"],
             "Miscellaneous": ["other", "misc", "various", "news", "update", "trending", "market"]
         }
+        self.keyword_matcher = KeywordMatcher(self.topic_map)
+
+    # ---------------- Model loading ---------------- #
+    def _load_sentiment(self):
+        with self._load_lock:
+            if self._loaded["sentiment"]:
+                return
+            # Sentiment pipeline on the selected backend ("torch", "quantized" or "onnx")
+            model, self.backend_report["sentiment"] = build_sentiment(
+                self.backend, self._device, self.model_cache_dir
+            )
+            self._set_sentiment(model)
+
+    def _set_sentiment(self, model):
+        self._sentiment = model
+        self._sentiment_batcher = BucketedBatcher(model.tokenizer, self.token_budget, self.max_batch_size, 256)
+        self._loaded["sentiment"] = True
+
+    def _load_summarizer(self):
+        with self._load_lock:
+            if self._loaded["summarizer"]:
+                return
+            try:
+                from transformers import pipeline
+                self._summarizer = pipeline(
+                    "summarization",
+                    model="facebook/bart-large-cnn",
+                    device=self._device
+                )
+            except Exception:
+                self._summarizer = None
+            self._loaded["summarizer"] = True
+
+    def _load_topics(self):
+        with self._load_lock:
+            if self._loaded["topics"]:
+                return
+            # Topic Modeling / Embeddings
+            try:
+                from bertopic import BERTopic
+                embedder, self.backend_report["embedding"] = build_embedder(self.backend, self.model_cache_dir)
+                self._set_topics(embedder, lambda: BERTopic(embedding_model=embedder, verbose=False))
+                return
+            except Exception:
+                from sklearn.feature_extraction.text import CountVectorizer
+                logger.warning("BERTopic unavailable — falling back to LDA.")
+                self._embedder = None
+                self._embedding_batcher = None
+                self._topic_model = None
+                self._embedding_cache = None
+                self._use_bertopic = False
+                self._count_vectorizer = CountVectorizer(
+                    stop_words="english",
+                    max_features=2000
+                )
+            self._loaded["topics"] = True
+
+    def _set_topics(self, embedder, topic_model_factory):
+        self._embedder = embedder
+        self._embedding_batcher = BucketedBatcher(
+            embedder.tokenizer, self.token_budget, self.max_batch_size, embedder.max_seq_length
+        )
+        self._embedding_cache = EmbeddingCache(
+            BucketedEncoder(embedder, self._embedding_batcher, pool=self.get_pool),
+            **self._embedding_cache_settings
+        )
+        self._topic_model = OnlineTopicEngine(
+            topic_model_factory, embed=self.embed, labeler=self.keyword_matcher.label, **self._topic_settings
+        )
+        self._use_bertopic = True
+        self._loaded["topics"] = True
+
+    def use_models(self, sentiment=None, summarizer=None, embedder=None, topic_model_factory=None):
+        """
+        Install already-built models instead of loading the defaults, e.g.
+        small stand-ins for offline benchmarks. Each model must follow the
+        interface of the one it replaces (HF pipeline / SentenceTransformer /
+        BERTopic factory).
+        """
+        with self._load_lock:
+            if sentiment is not None:
+                self.backend_report["sentiment"] = {"backend": "custom"}
+                self._set_sentiment(sentiment)
+            if summarizer is not None:
+                self._summarizer = summarizer
+                self._loaded["summarizer"] = True
+            if embedder is not None and topic_model_factory is not None:
+                self.backend_report["embedding"] = {"backend": "custom"}
+                self._set_topics(embedder, topic_model_factory)
+
+    def warm_up(self):
+        """Load every model now instead of on first use."""
+        start = time.time()
+        self._load_sentiment()
+        self._load_summarizer()
+        self._load_topics()
+        logger.info("NLP models loaded in %.1fs", time.time() - start)
+
+    @property
+    def ready(self):
+        return all(self._loaded.values())
+
+    def loaded_models(self):
+        return dict(self._loaded)
+
+    def loaded_embedding_cache(self):
+        """The embedding cache, or None until the topic models are loaded (never loads them)."""
+        return self._embedding_cache if self._loaded["topics"] else None
+
+    @property
+    def sentiment(self):
+        self._load_sentiment()
+        return self._sentiment
+
+    @property
+    def sentiment_batcher(self):
+        self._load_sentiment()
+        return self._sentiment_batcher
+
+    @property
+    def summarizer(self):
+        self._load_summarizer()
+        return self._summarizer
+
+    @property
+    def embedder(self):
+        self._load_topics()
+        return self._embedder
+
+    @property
+    def embedding_batcher(self):
+        self._load_topics()
+        return self._embedding_batcher
+
+    @property
+    def embedding_cache(self):
+        self._load_topics()
+        return self._embedding_cache
+
+    @property
+    def topic_model(self):
+        self._load_topics()
+        return self._topic_model
+
+    @property
+    def use_bertopic(self):
+        self._load_topics()
+        return self._use_bertopic
+
+    @property
+    def count_vectorizer(self):
+        self._load_topics()
+        return self._count_vectorizer
+
+    @property
+    def stop_words(self):
+        if self._stop_words is None:
+            self._stop_words = load_stopwords()
+        return self._stop_words
+
+    def flush(self):
+        """Persist on-disk caches, without loading anything that isn't loaded yet."""
+        if self._loaded["topics"] and self._embedding_cache:
+            self._embedding_cache.flush()
 
     # ---------------- Sentiment ---------------- #
-    def analyze_sentiment(self, text):
-        return self.sentiment(text, truncation=True)
+    def analyze_sentiment(self, texts):
+        """
+        Score texts, reusing cached results for exact (and optionally near-duplicate) texts.
+        Only texts not seen before are sent to the model.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
 
-    # ---------------- Summarization ---------------- #
-    def summarize(self, text, max_length=20):
-        if not self.summarizer:
-            return text[:160] + ("..." if len(text) > 160 else "")
-        s = self.summarizer(text, max_length=max_length, min_length=20, do_sample=False)
-        return s[0]["summary_text"]
+        results = [None] * len(texts)
+        pending = {}   # cache key -> positions of texts that need inference
+        exact, near = self.sentiment_cache.exact_hits, self.sentiment_cache.near_hits
+        for i, text in enumerate(texts):
+            key, cached = self.sentiment_cache.lookup(text)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            keys = list(pending)
+            batch = [texts[pending[k][0]] for k in keys]
+            pool = self.get_pool()
+            if pool:
+                scored = self.sentiment_batcher.run(batch, score, map_fn=pool.map,
+                                                    max_batch_size=pool.shard_size(len(batch)))
+            else:
+                scored = self.sentiment_batcher.run(
+                    batch,
+                    lambda b: self.sentiment(b, truncation=True, batch_size=len(b))
+                )
+            for key, text, res in zip(keys, batch, scored):
+                self.sentiment_cache.store(key, text, res)
+                for i in pending[key]:
+                    results[i] = res
+
+        self.last_sentiment_stats = {
+            "texts": len(texts),
+            "exact_hits": self.sentiment_cache.exact_hits - exact,
+            "near_hits": self.sentiment_cache.near_hits - near,
+            "inferred": len(pending),
+            "avoided": len(texts) - len(pending)
+        }
+        return results
+
+    # ---------------- Worker pool ---------------- #
+    def get_pool(self):
+        """The InferencePool, created on first use when workers > 0."""
+        if not self.workers:
+            return None
+        if self._pool is None:
+            # workers use the backends that passed the parity check here
+            self._load_sentiment()
+            self._load_topics()
+            embedding = self.backend_report.get("embedding", {}).get("backend")
+            self._pool = InferencePool(
+                self.workers,
+                threads_per_worker=self.threads_per_worker,
+                sentiment_backend=self.backend_report["sentiment"]["backend"],
+                embedding_backend=embedding,
+                cache_dir=self.model_cache_dir
+            )
+            logger.info("Started %d inference workers x %d threads", self.workers, self.threads_per_worker)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def padding_stats(self):
+        """Padding efficiency of the last sentiment, embedding and summarization calls."""
+        return {
+            "sentiment": self._sentiment_batcher.stats if self._loaded["sentiment"] else {},
+            "embedding": self._embedding_batcher.stats if self._loaded["topics"] and self._embedding_batcher else {},
+            "summarization": self.summary_batch_stats
+        }
+
+    # ---------------- Embeddings ---------------- #
+    def embed(self, texts):
+        """Sentence embeddings for texts, served from the cache where possible."""
+        return self.embedding_cache.encode(texts)
 
     # ---------------- Topic Helpers ---------------- #
     def get_topic_label(self, text):
-        """Return a topic label from the map, based on keywords in text."""
-        if not text:
-            return "Miscellaneous"
-
-        text_lower = text.lower()
-        for label, keywords in self.topic_map.items():
-            for kw in keywords:
-                if kw in text_lower:
-                    return label
-        return "Miscellaneous"
+        """Return the best-scoring topic label from the map, based on keywords in text."""
+        return self.keyword_matcher.label(text)
 
     # ---------------- Topic Fitting ---------------- #
     def fit_topics(self, texts):
         """
-        Fit BERTopic (or fallback LDA) and return mapped topic labels only.
+        Label texts with the topic_map keyword matcher (or fallback LDA-like
+        top terms). Returns (labels, None). With BERTopic the batch is only
+        added to the online engine's window; its refits run in the background.
         """
+        if self.degraded:
+            # under load skip the topic model (and so its refits)
+            return self.keyword_matcher.label_many(texts), None
         if self.use_bertopic:
-            topics, probs = self.topic_model.fit_transform(texts)
-            # Map topics using topic_map based on original texts
-            topic_labels = [self.get_topic_label(t) for t in texts]
-            return topic_labels, probs
+            self.topic_model.observe(texts)
+            return self.keyword_matcher.label_many(texts), None
         else:
             # Fallback LDA-like keyword extraction
             X = self.count_vectorizer.fit_transform(texts)
@@ -107,19 +398,102 @@ class NLPPipeline:
             for row in X:
                 arr = row.toarray().ravel()
                 idx = arr.argmax()
-                text_term = feature_names[idx] if arr.sum() > 0 else "Miscellaneous"
-                top_terms.append(self.get_topic_label(text_term))
-            return top_terms, None
+                top_terms.append(feature_names[idx] if arr.sum() > 0 else "")
+            return self.keyword_matcher.label_many(top_terms), None
 
     # ---------------- Topic Summaries ---------------- #
+    def _summarize_extractive(self, docs):
+        """Return the tweet closest to the topic centroid."""
+        if len(docs) == 1 or self.embedding_cache is None:
+            best = docs[0]
+        else:
+            vectors = self.embed(docs)
+            centroid = vectors.mean(axis=0)
+            best = docs[int((vectors @ centroid).argmax())]
+        return best[:160] + ("..." if len(best) > 160 else "")
+
+    def _summarize_batch(self, joined_texts, model, max_length=20):
+        """Summarize all topic texts in as few padded, length-bucketed batch calls as the token budget allows."""
+        batcher = BucketedBatcher(model.tokenizer, self.token_budget * 4, self.max_batch_size,
+                                  model.tokenizer.model_max_length)
+        out = batcher.run(
+            joined_texts,
+            lambda b: model(b, max_length=max_length, min_length=20, do_sample=False,
+                            truncation=True, batch_size=len(b))
+        )
+        self.summary_batch_stats = batcher.stats
+        return [s["summary_text"] for s in out]
+
+    def _light_tier(self):
+        if self.light_summarizer == "distilbart" and self._distil_summarizer is None:
+            try:
+                from transformers import pipeline
+                self._distil_summarizer = pipeline(
+                    "summarization",
+                    model="sshleifer/distilbart-cnn-12-6",
+                    device=self._device
+                )
+            except Exception as e:
+                logger.warning("DistilBART unavailable, using extractive summaries: %s", e)
+                self.light_summarizer = "extractive"
+        return self._distil_summarizer if self.light_summarizer == "distilbart" else None
+
+    def _term_profile(self, docs):
+        """Counts of the non-stopword terms in docs."""
+        stop_words = self.stop_words
+        terms = Counter()
+        for doc in docs:
+            terms.update(w for w in TERM_RE.findall(normalize_text(doc)) if w not in stop_words)
+        return terms
+
+    def topic_keywords(self, label):
+        """BERTopic cluster terms mapped to label at the last refit, [] before the first fit."""
+        if not (self._loaded["topics"] and self._use_bertopic):
+            return []
+        return self._topic_model.keywords.get(label, [])
+
     def get_topic_info(self, texts, topics):
         info = {}
         for text, topic in zip(texts, topics):
             info.setdefault(topic, []).append(text)
 
         topic_summaries = {}
+        stale = {}
+        now = time.time()
         for t, docs in info.items():
-            joined = " ".join(docs[:10])
-            summary = self.summarize(joined)
-            topic_summaries[t] = {"label": t, "count": len(docs), "summary": summary}
+            profile = self._term_profile(docs)
+            prev = self._summary_memo.get(t)
+            if (prev and now - prev[2] < self.summary_max_age
+                    and _cosine(profile, prev[0]) >= self.summary_reuse_threshold):
+                summary = prev[1]
+            else:
+                summary = None
+                stale[t] = (profile, docs)
+            topic_summaries[t] = {"label": t, "count": len(docs), "summary": summary,
+                                  "keywords": self.topic_keywords(t)}
+
+        if stale:
+            start = time.time()
+            labels = list(stale)
+            light = self.degraded or self.summarizer is None or time.time() < self._light_until
+            model = None if self.degraded else self._light_tier() if light else self.summarizer
+            if self.degraded:
+                # previous summary for the topic if there is one, else its first tweet
+                summaries = [self._summary_memo[t][1] if t in self._summary_memo
+                             else self._summarize_extractive(stale[t][1][:1]) for t in labels]
+            elif model is None and light:
+                summaries = [self._summarize_extractive(stale[t][1][:10]) for t in labels]
+            else:
+                summaries = self._summarize_batch([" ".join(stale[t][1][:10]) for t in labels], model)
+            for t, summary in zip(labels, summaries):
+                topic_summaries[t]["summary"] = summary
+                if not self.degraded:
+                    self._summary_memo[t] = (stale[t][0], summary, now)
+
+            elapsed = time.time() - start
+            if not light and self.summary_budget and elapsed > self.summary_budget:
+                logger.warning("Summarization took %.1fs (budget %ss), using %s summaries for %ss",
+                               elapsed, self.summary_budget, self.light_summarizer, self.summary_cooldown)
+                self._light_until = time.time() + self.summary_cooldown
+
         return topic_summaries
@@ -0,0 +1,65 @@
+import threading
+from collections import deque
+
+
+class UpdateChannel:
+    """
+    Pushes batch deltas to connected dashboards over Socket.IO.
+
+    Every completed batch becomes one "update" message with a sequence
+    number. Topics and aggregates are only included when they changed. The
+    last `history` messages are retained so a reconnecting client can ask
+    for everything after the last sequence number it saw; clients that fell
+    further behind get a "snapshot" with the tweets after their last offset
+    read from the event log.
+    """
+
+    def __init__(self, socketio, event_log, history=200, snapshot_limit=500):
+        self.socketio = socketio
+        self.event_log = event_log
+        self.snapshot_limit = snapshot_limit
+        self.seq = 0
+        self._history = deque(maxlen=history)
+        self._topics = None
+        self._aggregate = None
+        self._lock = threading.Lock()
+
+    def publish(self, tweets, topics, aggregate):
+        with self._lock:
+            self.seq += 1
+            delta = {"seq": self.seq, "tweets": tweets}
+            if topics != self._topics:
+                delta["topics"] = topics
+                self._topics = topics
+            if aggregate != self._aggregate:
+                delta["aggregate"] = aggregate
+                self._aggregate = aggregate
+            self._history.append(delta)
+        self.socketio.emit("update", delta)
+
+    def snapshot(self, last_offset=None):
+        # a dashboard only needs the most recent tweets, however far behind it is
+        newest_window = self.event_log.last_offset - self.snapshot_limit
+        last_offset = newest_window if last_offset is None else max(last_offset, newest_window)
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "tweets": self.event_log.read_after(last_offset, self.snapshot_limit),
+                "topics": self._topics or {},
+                "aggregate": self._aggregate or {}
+            }
+
+    def resume(self, last_seq, last_offset=None):
+        """Return ("update", [deltas]) after last_seq, or ("snapshot", state) if they are gone."""
+        with self._lock:
+            history = list(self._history)
+        if last_seq is None or (history and last_seq < history[0]["seq"] - 1) or last_seq > self.seq:
+            return "snapshot", self.snapshot(last_offset)
+        return "update", [d for d in history if d["seq"] > last_seq]
+
+    def reset(self):
+        with self._lock:
+            self._history.clear()
+            self._topics = None
+            self._aggregate = None
+        self.socketio.emit("reset", {"seq": self.seq, "offset": self.event_log.last_offset})
@@ -0,0 +1,42 @@
+import numpy as np
+
+COLUMNS = ("id", "text", "created_at", "ts", "sentiment_label", "sentiment_score", "topic", "weight")
+
+
+class ScoredBatch:
+    """
+    One processed batch kept as columns (lists or NumPy arrays) from the
+    models to the publish stage. Per-row dicts are only built for
+    serialization, by `to_dicts`. `weight` is the number of stream tweets
+    each row stands for (the load shedder's sample_weight, 1 by default).
+    """
+
+    def __init__(self, id, text, created_at, ts, sentiment_label, sentiment_score, topic, weight=None):
+        self.columns = {
+            "id": id,
+            "text": text,
+            "created_at": created_at,
+            "ts": np.asarray(ts, dtype=np.float64),
+            "sentiment_label": sentiment_label,
+            "sentiment_score": np.asarray(sentiment_score, dtype=np.float64),
+            "topic": topic,
+            "weight": np.ones(len(id)) if weight is None else np.asarray(weight, dtype=np.float64),
+        }
+
+    @classmethod
+    def from_dicts(cls, rows):
+        return cls(*([row[c] for row in rows] for c in COLUMNS))
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def rows(self):
+        """Tuples in COLUMNS order with plain Python values."""
+        cols = [c.tolist() if isinstance(c, np.ndarray) else list(c) for c in self.columns.values()]
+        return zip(*cols)
+
+    def to_dicts(self):
+        return [dict(zip(COLUMNS, row)) for row in self.rows()]
@@ -0,0 +1,206 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Latency and throughput counters for one pipeline stage."""
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, items, seconds):
+        self.batches += 1
+        self.items += items
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+
+    def as_dict(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "last_ms": round(self.last_seconds * 1000, 1),
+            "avg_ms": round(self.total_seconds * 1000 / self.batches, 1) if self.batches else 0.0
+        }
+
+
+class StagedPipeline:
+    """
+    Fetch -> inference -> publish, each in its own thread and connected by
+    bounded queues. A full queue blocks the stage feeding it (backpressure),
+    so ingestion overlaps with inference without buffering without limit.
+
+    fetch()          -> list of items; called every `fetch_interval` seconds
+                        (0: back to back, limited only by backpressure)
+    process(items)   -> result; called on micro-batches of up to `max_batch`
+                        items, flushed early after `max_wait_ms`
+    publish(result)  -> None
+
+    With a `shedder` (load_shedder.LoadShedder), the inference stage checks
+    the backlog before each batch; while degraded mode alone can't keep up it
+    drains the queue and processes only the shedder's sample of it.
+    """
+
+    def __init__(self, fetch, process, publish, fetch_interval=2, max_batch=50, max_wait_ms=1000,
+                 queue_size=500, result_queue_size=4, shedder=None):
+        self.fetch = fetch
+        self.process = process
+        self.publish = publish
+        self.fetch_interval = fetch_interval
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.shedder = shedder
+        self.items = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue(maxsize=result_queue_size)
+        self.stats = {name: StageStats() for name in ("fetch", "inference", "publish")}
+        self._stop = threading.Event()
+        self._in_flight = 0   # items fetched but not yet published (or dropped on error)
+        self._in_flight_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._fetch_loop, name="stage-fetch", daemon=True),
+            threading.Thread(target=self._inference_loop, name="stage-inference", daemon=True),
+            threading.Thread(target=self._publish_loop, name="stage-publish", daemon=True),
+        ]
+
+    # ---------------- Lifecycle ---------------- #
+    def start(self):
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    @property
+    def idle(self):
+        """True when every fetched item has been through publish."""
+        return self._in_flight == 0
+
+    def _done(self, n):
+        with self._in_flight_lock:
+            self._in_flight -= n
+
+    def _put(self, q, item):
+        """Blocking put that still notices stop()."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # ---------------- Stages ---------------- #
+    def _fetch_loop(self):
+        while not self._stop.is_set():
+            start = time.time()
+            items = []
+            try:
+                items = self.fetch() or []
+                self.stats["fetch"].record(len(items), time.time() - start)
+                with self._in_flight_lock:
+                    self._in_flight += len(items)
+                for item in items:
+                    if not self._put(self.items, item):
+                        return
+            except Exception as e:
+                self.stats["fetch"].errors += 1
+                logger.error("Error in fetch stage: %s", e)
+            self._stop.wait(self.fetch_interval or (0 if items else 0.5))
+
+    def _next_batch(self):
+        """Collect up to max_batch items, flushing max_wait seconds after the first one."""
+        try:
+            batch = [self.items.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.items.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, batch):
+        """The batch followed by everything queued behind it."""
+        yield from batch
+        while True:
+            try:
+                yield self.items.get_nowait()
+            except queue.Empty:
+                return
+
+    def _shed(self, batch):
+        # degraded mode (cheaper processing) first; sample only if that still can't keep up
+        backlog = self.items.qsize()
+        if not self.shedder.update(backlog) or not self.shedder.should_sample(backlog):
+            return batch
+        kept, dropped = self.shedder.sample(self._drain(batch), self.shedder.capacity())
+        self._done(dropped)
+        return kept
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch and self.shedder:
+                batch = self._shed(batch)
+            if not batch:
+                continue
+            start = time.time()
+            try:
+                result = self.process(batch)
+            except Exception as e:
+                self.stats["inference"].errors += 1
+                logger.exception("Error in inference stage: %s", e)
+                self._done(len(batch))
+                continue
+            self.stats["inference"].record(len(batch), time.time() - start)
+            if self.shedder:
+                self.shedder.record(len(batch), time.time() - start)
+            if not self._put(self.results, (len(batch), result)):
+                return
+
+    def _publish_loop(self):
+        while not self._stop.is_set():
+            try:
+                n, result = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.time()
+            try:
+                self.publish(result)
+                self.stats["publish"].record(1, time.time() - start)
+            except Exception as e:
+                self.stats["publish"].errors += 1
+                logger.exception("Error in publish stage: %s", e)
+            finally:
+                self._done(n)
+
+    def snapshot(self):
+        return {
+            "queues": {
+                "items": {"depth": self.items.qsize(), "capacity": self.items.maxsize},
+                "results": {"depth": self.results.qsize(), "capacity": self.results.maxsize}
+            },
+            "stages": {name: s.as_dict() for name, s in self.stats.items()},
+            "shedding": self.shedder.stats() if self.shedder else None
+        }
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class OnlineTopicEngine:
+    """
+    Keeps a persistent BERTopic model fitted on a rolling window of the
+    stream. Batches are only appended to the window (no per-batch
+    `transform` or embedding); the model is fitted once on a warm-up corpus
+    and refitted in the background, so per-batch cost stays flat.
+
+    After each fit the clusters' top terms are labeled with `labeler` and
+    kept in `keywords` (label -> terms) for the topic summaries.
+    """
+
+    def __init__(self, model_factory, warmup_size=200, window_size=2000, refit_interval=600,
+                 embed=None, labeler=None, top_terms=5):
+        self.model_factory = model_factory      # callable returning a fresh, unfitted BERTopic
+        self.embed = embed                      # texts -> embeddings, called from the refit thread
+        self.labeler = labeler                  # text -> topic_map label
+        self.top_terms = top_terms
+        self.warmup_size = warmup_size          # docs needed before the first fit
+        self.refit_interval = refit_interval    # seconds between background refits
+        self.window = deque(maxlen=window_size)
+        self.model = None
+        self.keywords = {}
+        self.last_fit = 0.0
+        self.fit_count = 0
+        self._lock = threading.Lock()
+        self._fitting = False
+        self._retry_after = 0.0
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    def observe(self, texts):
+        """Add texts to the refit window."""
+        with self._lock:
+            self.window.extend(texts)
+
+        self._maybe_refit()
+
+    def _maybe_refit(self):
+        with self._lock:
+            if self._fitting or time.time() < self._retry_after:
+                return
+            if self.model is None:
+                due = len(self.window) >= self.warmup_size
+            else:
+                due = time.time() - self.last_fit >= self.refit_interval
+            if not due:
+                return
+            self._fitting = True
+            docs = list(self.window)
+
+        worker = threading.Thread(target=self._refit, args=(docs,), daemon=True)
+        worker.start()
+
+    def _refit(self, docs):
+        try:
+            embeddings = self.embed(docs) if self.embed else None
+            model = self.model_factory()
+            model.fit(docs, embeddings=embeddings)
+            keywords = self._label_clusters(model)
+            with self._lock:
+                self.model = model
+                self.keywords = keywords
+                self.last_fit = time.time()
+                self.fit_count += 1
+            logger.info("Topic model refitted on %d docs", len(docs))
+        except Exception as e:
+            logger.warning("Topic model refit failed: %s", e)
+            # back off instead of retrying on every batch
+            self._retry_after = time.time() + min(self.refit_interval, 60)
+        finally:
+            with self._lock:
+                self._fitting = False
+
+    def _label_clusters(self, model):
+        """Map each cluster's top terms to a topic_map label (outlier cluster -1 skipped)."""
+        keywords = {}
+        if not self.labeler:
+            return keywords
+        for topic, words in model.get_topics().items():
+            if topic == -1:
+                continue
+            terms = [w for w, _ in words[:self.top_terms] if w]
+            if terms:
+                merged = keywords.setdefault(self.labeler(" ".join(terms)), [])
+                merged.extend(t for t in terms if t not in merged)
+        return keywords
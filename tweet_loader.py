@@ -0,0 +1,236 @@
+"""
+Streaming reader for tweet archives of any size.
+
+Accepts JSON Lines, a top-level JSON array, or the X API `{"data": [...]}`
+envelope, optionally gzip- or zstd-compressed (detected from the magic
+bytes; zstd needs the `zstandard` package). Records are decoded one at a
+time with `json.JSONDecoder.raw_decode` over a fixed-size read buffer, so
+memory stays flat regardless of file size.
+
+    loader = TweetLoader("archive.jsonl.zst")
+    for batch in loader.batches(500):
+        ...
+    loader.position   # {"byte": ..., "record": ...}, pass back as `start` to resume
+
+Byte offsets are positions in the uncompressed stream. Resuming a plain
+file seeks straight there; a compressed one is decompressed up to it.
+"""
+import codecs
+import gzip
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+NON_WHITESPACE = re.compile(r"[^ \t\r\n\ufeff]")   # a leading BOM counts as whitespace
+
+# Shapes of the decoded stream
+SEQUENCE = "sequence"   # JSONL, or any whitespace-separated JSON objects
+ARRAY = "array"         # [ {...}, {...} ] or {"data": [ {...}, ... ], ...}
+
+
+def _open_binary(path):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rb"), True
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError(f"{path} is zstd-compressed; install the 'zstandard' package") from e
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True), True
+    return open(path, "rb"), False
+
+
+class TweetLoader:
+    """
+    Lazily yields tweet dicts from `path`, starting at `start`
+    ({"byte": n} and/or {"record": n}, as returned by `position`).
+    Records that fail to decode in a JSONL file are skipped and counted in
+    `errors`; anything larger than `max_record_bytes` is treated as corrupt.
+    """
+
+    def __init__(self, path, start=None, chunk_size=1 << 20, max_record_bytes=16 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.max_record_bytes = max_record_bytes
+        start = start or {}
+        self.start_byte = int(start.get("byte", 0))
+        self.start_record = int(start.get("record", 0))
+        self.byte = self.start_byte
+        self.record = self.start_record
+        self.errors = 0
+        self._inside = False   # part way through a value that holds several records
+        self._decoder = json.JSONDecoder()
+
+    @property
+    def position(self):
+        """
+        Where the next record starts; pass as `start` to resume after the
+        records already yielded. Inside a non-streamed envelope there is no
+        byte boundary to resume from, so only the record offset is given.
+        """
+        if self._inside:
+            return {"record": self.record}
+        return {"byte": self.byte, "record": self.record}
+
+    # ---------------- Buffer ---------------- #
+    def _fill(self):
+        """Read one more chunk into the buffer. Returns False at end of file."""
+        raw = self._stream.read(self.chunk_size)
+        if not raw:
+            self._buf += self._text.decode(b"", final=True)
+            self._eof = True
+            return False
+        # drop what's already been consumed before growing the buffer
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += self._text.decode(raw)
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character, reading more as needed ('' at end of file)."""
+        while True:
+            match = NON_WHITESPACE.search(self._buf, self._pos)
+            if match:
+                self._advance(match.start())
+                return self._buf[self._pos]
+            self._advance(len(self._buf))
+            if not self._fill():
+                return ""
+
+    def _advance(self, end):
+        self.byte += len(self._buf[self._pos:end].encode("utf-8"))
+        self._pos = end
+
+    def _decode(self):
+        """Decode the JSON value at the cursor, reading more until it is complete."""
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                too_big = len(self._buf) - self._pos > self.max_record_bytes
+                if self._eof or too_big or not self._fill():
+                    raise
+                continue
+            if end == len(self._buf) and not self._eof and isinstance(value, (int, float)):
+                self._fill()   # a number at the buffer edge may continue in the next chunk
+                continue
+            self._advance(end)
+            return value
+
+    def _skip_line(self):
+        """Drop the rest of a corrupt JSONL line."""
+        while "\n" not in self._buf[self._pos:]:
+            if not self._fill():
+                self._advance(len(self._buf))
+                return
+        self._advance(self._buf.index("\n", self._pos) + 1)
+
+    # ---------------- Structure ---------------- #
+    def _open(self):
+        self._stream, _ = _open_binary(self.path)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buf, self._pos, self._eof = "", 0, False
+        self.byte = 0
+
+    def _detect_shape(self):
+        """Read the head of the stream to find the record layout. Leaves the cursor on the first record."""
+        first = self._peek()
+        if first == "[":
+            self._advance(self._pos + 1)
+            return ARRAY
+        if first == "{":
+            # {"data": [ ... streams the data array; any other object is the first record
+            self._advance(self._pos + 1)
+            if self._peek() == '"':
+                key = self._decode()
+                if key == "data" and self._peek() == ":":
+                    self._advance(self._pos + 1)
+                    if self._peek() == "[":
+                        self._advance(self._pos + 1)
+                        return ARRAY
+            self._stream.close()
+            self._open()
+        return SEQUENCE
+
+    def _seek(self, offset):
+        """Position the stream at uncompressed byte `offset` (on a record boundary)."""
+        self._stream.close()
+        self._stream, compressed = _open_binary(self.path)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buf, self._pos, self._eof = "", 0, False
+        if compressed:
+            remaining = offset
+            while remaining > 0:
+                skipped = len(self._stream.read(min(remaining, self.chunk_size)))
+                if not skipped:
+                    break
+                remaining -= skipped
+        else:
+            self._stream.seek(offset)
+        self.byte = offset
+
+    def _records(self):
+        self._open()
+        try:
+            shape = self._detect_shape()
+            if self.start_byte:
+                self._seek(self.start_byte)
+            index = 0
+            while True:
+                c = self._peek()
+                if shape == ARRAY:
+                    if c == ",":
+                        self._advance(self._pos + 1)
+                        c = self._peek()
+                    if c in ("]", ""):
+                        return   # trailing keys of an envelope ("meta", "includes") are ignored
+                elif c == "":
+                    return
+                try:
+                    value = self._decode()
+                except json.JSONDecodeError as e:
+                    if shape == ARRAY:
+                        raise ValueError(f"Malformed JSON in {self.path} near byte {self.byte}: {e}") from e
+                    self.errors += 1
+                    logger.warning("Skipping malformed record in %s near byte %d: %s", self.path, self.byte, e)
+                    self._skip_line()
+                    continue
+
+                # a non-streamed envelope ({"meta": ..., "data": [...]}) or a bare object
+                if shape == SEQUENCE and isinstance(value, dict) and isinstance(value.get("data"), list):
+                    values = value["data"]
+                else:
+                    values = value if isinstance(value, list) else [value]
+                for i, v in enumerate(values):
+                    if not self.start_byte and index < self.start_record:
+                        index += 1
+                        continue
+                    index += 1
+                    self.record += 1
+                    self._inside = i < len(values) - 1
+                    yield v
+                self._inside = False
+        finally:
+            self._stream.close()
+
+    # ---------------- Public API ---------------- #
+    def __iter__(self):
+        return self._records()
+
+    def batches(self, size=50):
+        """Lists of up to `size` records, read on demand."""
+        batch = []
+        for record in self._records():
+            batch.append(record)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
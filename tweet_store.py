@@ -0,0 +1,212 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from scored_batch import COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    created_at TEXT,
+    text TEXT,
+    sentiment_label TEXT,
+    sentiment_score REAL,
+    topic TEXT,
+    weight REAL NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_ts ON tweets (ts);
+CREATE INDEX IF NOT EXISTS idx_tweets_topic_ts ON tweets (topic, ts);
+CREATE TABLE IF NOT EXISTS topics (
+    topic TEXT PRIMARY KEY,
+    summary TEXT,
+    count INTEGER,
+    updated_at REAL
+);
+"""
+
+
+class TweetStore:
+    """
+    Scored tweets and the latest topic summaries in a local SQLite file.
+
+    Writes are buffered and inserted with one `executemany` per flush
+    (every `batch_size` rows or `flush_interval` seconds), so the publish
+    stage never waits on a commit per tweet. Tweets are indexed on time and
+    on (topic, time), which is what replay and the historical queries scan.
+    The file is created on first use.
+
+    Retention: at most every `prune_interval` seconds a flush deletes tweets
+    beyond the newest `max_rows` and, with `max_age` (seconds), tweets whose
+    timestamp is older than that.
+    """
+
+    def __init__(self, path="tweets.db", batch_size=500, flush_interval=5.0, max_rows=1_000_000,
+                 max_age=None, prune_interval=60.0, stats_ttl=30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self.stats_ttl = stats_ttl              # seconds the COUNT(*) in stats() is reused
+        self.pruned = 0
+        self._pending = []
+        self._topics = {}
+        self._last_flush = time.time()
+        self._last_prune = 0.0
+        self._stats = None                      # (computed at, row) cache for stats()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tweets)")}
+            if "weight" not in columns:
+                # stores written before sample weights were kept: every row counts once
+                self._conn.execute("ALTER TABLE tweets ADD COLUMN weight REAL NOT NULL DEFAULT 1")
+        return self._conn
+
+    # ---------------- Writes ---------------- #
+    def write(self, batch, topic_info=None):
+        """Buffer a ScoredBatch and the batch's topic summaries."""
+        now = time.time()
+        with self._lock:
+            self._pending.extend(batch.rows())
+            for topic, info in (topic_info or {}).items():
+                if isinstance(info, dict) and info.get("summary") is not None:
+                    self._topics[str(topic)] = (str(topic), info["summary"], info.get("count", 0), now)
+            if len(self._pending) >= self.batch_size or now - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.time()
+        if not self._pending and not self._topics:
+            return
+        rows, topics = self._pending, list(self._topics.values())
+        self._pending, self._topics = [], {}
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO tweets ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows
+                )
+                conn.executemany("INSERT OR REPLACE INTO topics VALUES (?, ?, ?, ?)", topics)
+        except sqlite3.Error as e:
+            logger.error("Error writing %d tweets to %s: %s", len(rows), self.path, e)
+        if self._last_flush - self._last_prune >= self.prune_interval:
+            self._prune()
+
+    def _prune(self):
+        self._last_prune = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                deleted = 0
+                if self.max_age:
+                    deleted += conn.execute("DELETE FROM tweets WHERE ts < ?",
+                                            (self._last_prune - self.max_age,)).rowcount
+                if self.max_rows:
+                    # everything older than the max_rows-th newest tweet (no-op while under the cap)
+                    deleted += conn.execute(
+                        "DELETE FROM tweets WHERE ts < (SELECT ts FROM tweets ORDER BY ts DESC LIMIT 1 OFFSET ?)",
+                        (self.max_rows - 1,)
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.error("Error pruning %s: %s", self.path, e)
+            return
+        if deleted:
+            self.pruned += deleted
+            self._stats = None
+            logger.info("Pruned %d tweets from %s", deleted, self.path)
+
+    # ---------------- Reads ---------------- #
+    def _query(self, sql, params=()):
+        with self._lock:
+            self._flush()
+            conn = self._connect()
+            cur = conn.execute(sql, params)
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def replay(self, since=None, until=None, batch_size=200):
+        """Stored tweets in time order, `batch_size` at a time (keyset paginated on (ts, id))."""
+        ts, last_id = (since if since is not None else float("-inf")), ""
+        until = until if until is not None else float("inf")
+        while True:
+            rows = self._query(
+                f"SELECT {', '.join(COLUMNS)} FROM tweets "
+                "WHERE (ts > ? OR (ts = ? AND id > ?)) AND ts <= ? ORDER BY ts, id LIMIT ?",
+                (ts, ts, last_id, until, batch_size)
+            )
+            if not rows:
+                return
+            yield rows
+            ts, last_id = rows[-1]["ts"], rows[-1]["id"]
+
+    def topic_summaries(self, topics=None):
+        rows = self._query("SELECT topic, summary, count FROM topics")
+        wanted = None if topics is None else {str(t) for t in topics}
+        return {
+            r["topic"]: {"label": r["topic"], "count": r["count"], "summary": r["summary"]}
+            for r in rows if wanted is None or r["topic"] in wanted
+        }
+
+    def sentiment_by_topic(self, hours=168, bucket_seconds=3600, topic=None, now=None):
+        """
+        Count, mean score and label mix per topic per bucket over the last
+        `hours`. `count` is the stored tweets; the mean and the label mix
+        weight each by its sample weight, so they estimate the full stream
+        (`estimated` tweets) even for buckets that were load-shed.
+        """
+        now = time.time() if now is None else now
+        sql = (
+            "SELECT topic, CAST(ts / :bucket AS INTEGER) * :bucket AS bucket, COUNT(*) AS count, "
+            "SUM(weight) AS estimated, "
+            "SUM(weight * sentiment_score) / SUM(weight) AS mean, "
+            "SUM(weight * (sentiment_label = 'positive')) AS positive, "
+            "SUM(weight * (sentiment_label = 'neutral')) AS neutral, "
+            "SUM(weight * (sentiment_label = 'negative')) AS negative "
+            "FROM tweets WHERE ts >= :since"
+        )
+        params = {"bucket": bucket_seconds, "since": now - hours * 3600}
+        if topic is not None:
+            sql += " AND topic = :topic"
+            params["topic"] = str(topic)
+        sql += " GROUP BY topic, bucket ORDER BY bucket, topic"
+        return self._query(sql, params)
+
+    def stats(self):
+        """Row count and time range, recounted at most every `stats_ttl` seconds."""
+        base = {"path": self.path, "pending": len(self._pending), "pruned": self.pruned,
+                "max_rows": self.max_rows, "max_age": self.max_age}
+        if self._conn is None and not os.path.exists(self.path):
+            return {**base, "rows": 0}
+        cached = self._stats
+        if cached is None or time.time() - cached[0] >= self.stats_ttl:
+            row = self._query("SELECT COUNT(*) AS rows, MIN(ts) AS oldest, MAX(ts) AS newest FROM tweets")[0]
+            cached = self._stats = (time.time(), row)
+        return {**base, **cached[1]}
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,68 @@
+"""
+Optional multi-process execution for the sentiment model and the embedder.
+
+Each worker process loads the models once in its initializer and then
+scores shards of a batch, so tokenization and pre/post-processing run
+outside the main process's GIL. Every worker holds its own copy of the
+weights, so budget memory for N copies, and size workers x
+threads_per_worker to the number of physical cores.
+"""
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+_sentiment = None
+_embedder = None
+
+
+def _init_worker(sentiment_backend, embedding_backend, cache_dir, threads):
+    global _sentiment, _embedder
+    # must be set before torch creates its thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    import torch
+    torch.set_num_threads(threads)
+
+    from inference_backend import build_embedder, build_sentiment
+    _sentiment, _ = build_sentiment(sentiment_backend, -1, cache_dir, verify=False)
+    if embedding_backend:
+        _embedder, _ = build_embedder(embedding_backend, cache_dir, verify=False)
+
+
+def score(texts):
+    return _sentiment(texts, truncation=True, batch_size=len(texts))
+
+
+def embed(texts):
+    return _embedder.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+
+class InferencePool:
+    """
+    Process pool whose workers each hold their own copy of the models.
+    Backends should be the ones that already passed the parity check in the
+    parent; embedding_backend=None skips loading the embedder.
+    """
+
+    def __init__(self, workers, threads_per_worker=1, sentiment_backend="torch", embedding_backend="torch",
+                 cache_dir=".model_cache"):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(sentiment_backend, embedding_backend, cache_dir, threads_per_worker)
+        )
+
+    def map(self, fn, shards):
+        return list(self.executor.map(fn, shards))
+
+    def shard_size(self, n):
+        """Largest shard that still gives every worker something to do."""
+        return max(1, math.ceil(n / self.workers))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
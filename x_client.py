@@ -1,47 +1,163 @@
+import logging
 import os
-import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Override to point the client at a local mock server
+X_RECENT_SEARCH = os.getenv("X_RECENT_SEARCH_URL", "https://api.x.com/2/tweets/search/recent")
+
+
+class RateLimit:
+    """Tracks the x-rate-limit-* headers so requests are scheduled instead of slept on."""
+
+    def __init__(self):
+        self.remaining = None
+        self.reset = 0
+        self._lock = threading.Lock()
+
+    def update(self, headers, exhausted=False):
+        with self._lock:
+            if "x-rate-limit-remaining" in headers:
+                self.remaining = int(headers["x-rate-limit-remaining"])
+            if "x-rate-limit-reset" in headers:
+                self.reset = int(headers["x-rate-limit-reset"])
+            if exhausted:
+                self.remaining = 0
+                if self.reset <= time.time():
+                    self.reset = int(time.time()) + 60
+
+    def acquire(self):
+        """Reserve one request; False while the window is exhausted."""
+        with self._lock:
+            if self.remaining is not None and self.remaining <= 0:
+                if time.time() < self.reset:
+                    return False
+                self.remaining = None   # window has reset, headers will tell us the new budget
+            if self.remaining is not None:
+                self.remaining -= 1
+            return True
+
+    def seconds_until_ready(self):
+        if self.remaining is not None and self.remaining <= 0:
+            return max(self.reset - time.time(), 0)
+        return 0
+
+
+class QueryState:
+    """Per-query cursor: since_id of the newest tweet seen and an unfinished pagination."""
+
+    def __init__(self, query):
+        self.query = query
+        self.since_id = None
+        self.next_token = None
+        self.pending_newest = None   # newest_id of a poll whose pages are not all read yet
 
-X_RECENT_SEARCH = "https://api.x.com/2/tweets/search/recent"
 
 class XClient:
-    def __init__(self, bearer_token: str, query: str, max_results=10):
+    def __init__(self, bearer_token: str, query: str, max_results=10, queries=None,
+                 base_url=X_RECENT_SEARCH, max_pages=5, pool_size=8):
         self.bearer_token = bearer_token
         self.query = query
         self.max_results = max_results
-        self.next_token = None
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.states = [QueryState(q) for q in ([query] if query else []) + list(queries or [])]
+        self.rate_limit = RateLimit()
+        self.rate_limited = 0   # 429 responses seen
+
+        # One pooled session so connections (and TLS) are reused across polls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self._headers())
+        self._executor = ThreadPoolExecutor(max_workers=pool_size)
+
+    @property
+    def next_token(self):
+        return self.states[0].next_token if self.states else None
 
     def _headers(self):
         return {"Authorization": f"Bearer {self.bearer_token}"}
 
-    def build_params(self):
+    def build_params(self, state=None):
+        state = state or self.states[0]
         params = {
-            "query": self.query,
+            "query": state.query,
             "tweet.fields": "created_at,lang,public_metrics,author_id",
             "max_results": str(self.max_results)
         }
-        if self.next_token:
-            params["next_token"] = self.next_token
+        if state.since_id:
+            params["since_id"] = state.since_id
+        if state.next_token:
+            params["next_token"] = state.next_token
         return params
 
-    def fetch_recent(self):
-        while True:
+    def _poll(self, state):
+        """
+        Read new tweets for one query. The first poll takes only the newest
+        page and starts from there; later polls follow next_token back to
+        since_id, which bounds the paging to tweets not seen yet.
+        """
+        tweets = []
+        for _ in range(self.max_pages):
+            if not self.rate_limit.acquire():
+                break
             try:
-                r = requests.get(X_RECENT_SEARCH, headers=self._headers(), params=self.build_params(), timeout=10)
-                print(r.request.path_url)
-                if r.status_code == 429:
-                    reset = int(r.headers.get("x-rate-limit-reset", time.time() + 60))
-                    sleep_time = max(reset - int(time.time()), 1)
-                    print(f"Rate limit hit. Sleeping for {sleep_time} seconds...")
-                    time.sleep(sleep_time)
-                    continue
-                elif r.status_code != 200:
-                    print("Twitter API error:", r.status_code, r.text)
-                    time.sleep(5)
-                    continue
-                data = r.json()
-                self.next_token = data.get("meta", {}).get("next_token")
-                return data.get("data", [])
+                r = self.session.get(self.base_url, params=self.build_params(state), timeout=10)
             except Exception as e:
-                print("Error fetching tweets:", e)
-                time.sleep(5)
\ No newline at end of file
+                logger.warning("Error fetching tweets: %s", e)
+                break
+            if r.status_code == 429:
+                self.rate_limited += 1
+                self.rate_limit.update(r.headers, exhausted=True)
+                logger.warning("Rate limit hit, next request in %.0fs", self.rate_limit.seconds_until_ready())
+                break
+            self.rate_limit.update(r.headers)
+            if r.status_code != 200:
+                logger.warning("Twitter API error: %s %s", r.status_code, r.text)
+                break
+
+            data = r.json()
+            meta = data.get("meta", {})
+            tweets.extend(data.get("data", []))
+            if state.since_id is None:
+                # no lower bound yet: older pages would walk back through days of history
+                state.since_id = meta.get("newest_id")
+                state.next_token = None
+                break
+            if state.pending_newest is None:
+                state.pending_newest = meta.get("newest_id")
+            state.next_token = meta.get("next_token")
+            if not state.next_token:
+                # caught up: everything newer than since_id has been read
+                if state.pending_newest:
+                    state.since_id = state.pending_newest
+                state.pending_newest = None
+                break
+        return tweets
+
+    def fetch_recent(self):
+        """
+        Poll every query concurrently and return the new tweets. Returns early
+        (possibly empty) while rate limited; unread pages resume on the next call.
+        """
+        if len(self.states) == 1:
+            return self._poll(self.states[0])
+        tweets = []
+        for batch in self._executor.map(self._poll, self.states):
+            tweets.extend(batch)
+        return tweets
+
+    def seconds_until_ready(self):
+        return self.rate_limit.seconds_until_ready()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()